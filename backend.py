@@ -1,5 +1,7 @@
 import asyncio
-from typing import Union, List
+from math import inf
+from time import monotonic
+from typing import Union, List, Tuple
 from enums import SyncMode, ActionType, ActionDirection
 from config import RobinHoodProfile
 from filesystem import FileSystemObject, FileSystem, fs_auto_determine, rclone_instance, synched_walk, FileType
@@ -7,6 +9,67 @@ from file_filters import FileFilter, UnixPatternExpasionFilter, RemoveHiddenFile
 from synching import SynchManager, _get_trigger_fn
 from events import SyncEvent, RobinHoodBackend
 
+# Max number of times per second the comparison gives control back to the event loop (and updates the UI)
+EVENTS_RATE = 30
+
+
+def _apply_update(a: FileSystemObject, type: ActionType, direction: ActionDirection) \
+        -> Tuple[ActionType, ActionDirection]:
+    """
+    Update rules: any action destination-to-source is not considered
+    :param a: The source file system object
+    :param type: The action worked out by the comparison
+    :param direction: The direction worked out by the comparison
+    :return: A tuple with the action and direction to apply
+    """
+    if direction == ActionDirection.DST2SRC:
+        return ActionType.NOTHING, ActionDirection.SRC2DST
+
+    if direction == ActionDirection.BOTH:
+        return type, ActionDirection.SRC2DST
+
+    return type, direction
+
+
+def _apply_mirror(a: FileSystemObject, type: ActionType, direction: ActionDirection) \
+        -> Tuple[ActionType, ActionDirection]:
+    """
+    Mirror rules: the destination becomes like the source, so anything missing in the source is deleted
+    (see _apply_update for the parameters)
+    """
+    if direction == ActionDirection.DST2SRC:
+        return (ActionType.COPY if a.exists else ActionType.DELETE), ActionDirection.SRC2DST
+
+    return type, direction
+
+
+def _apply_sync(a: FileSystemObject, type: ActionType, direction: ActionDirection) \
+        -> Tuple[ActionType, ActionDirection]:
+    """
+    Sync rules: actions are kept as they are (see _apply_update for the parameters)
+    """
+    return type, direction
+
+
+# Rules applied to each action depending on the synching modality (see compare_tree)
+_MODE_RULES = {
+    SyncMode.UPDATE: _apply_update,
+    SyncMode.MIRROR: _apply_mirror,
+}
+
+
+async def _get_file_system(path: Union[str | FileSystem]) -> FileSystem:
+    """
+    If the provided path is a string, the function fs_auto_determine attempts to determine if it's local or remote
+    :param path: A path or a file system
+    :return: A file system (the same one, if a file system is provided)
+    """
+    if isinstance(path, str):
+        path = await fs_auto_determine(path, True)
+        path.cached = True
+
+    return path
+
 
 async def compare_tree(src: Union[str | FileSystem],
                        dest: Union[str | FileSystem],
@@ -27,24 +90,18 @@ async def compare_tree(src: Union[str | FileSystem],
     _trigger = _get_trigger_fn(eventhandler)
     _trigger("before_comparing", SyncEvent(src))
 
-    # if the provided source path is a dir, then the function fs_auto_determine attempts to determine if it's local or remote
-    if isinstance(src, str):
-        src = await fs_auto_determine(src, True)
-        src.cached = True
+    # Source and destination are independent of each other, so they are determined and loaded at the same time
+    src, dest = await asyncio.gather(_get_file_system(src), _get_file_system(dest))
 
-    # Same as above, but with the destination path
-    if isinstance(dest, str):
-        dest = await fs_auto_determine(dest, True)
-        dest.cached = True
+    async def _load_destination() -> None:
+        # The destination may not exist yet
+        try:
+            await dest.load()
+        except FileNotFoundError:
+            ...
 
     # load file system cache
-
-    await src.load()
-
-    try:
-        await dest.load()
-    except FileNotFoundError:
-        ...
+    await asyncio.gather(src.load(), _load_destination())
 
     # Parse the result obtained  from rclone
     sync_changes = SynchManager(src, dest)
@@ -62,85 +119,83 @@ async def compare_tree(src: Union[str | FileSystem],
 
     filter_set = FilterSet(*filters)
 
-    # Get list of directories/files from both sides
-    tree = [x async for x in synched_walk(src, dest)]
-    processed_items = 0
+    # The synching modality doesn't change during the comparison, so its rules are picked once
+    apply_mode = _MODE_RULES.get(mode, _apply_sync)
 
+    # Directories/files from both sides (and how many they are, to show the progress)
+    total_items, tree = await synched_walk(src, dest)
+    processed_items = 0
+    last_event = -inf
+
+    # The loop below runs for each item in both trees: anything it uses is bound locally to save attribute lookups
+    BOTH, SRC2DST, DST2SRC = ActionDirection.BOTH, ActionDirection.SRC2DST, ActionDirection.DST2SRC
+    NOTHING, COPY = ActionType.NOTHING, ActionType.COPY
+    make_action = SynchManager.make_action
+    filter_any = filter_set.filter_any
+    # Actions are collected and handed over to the manager all together at the end (see add_actions)
+    actions = []
+    add_action = actions.append
+
+    # Paths given by synched_walk come from the rclone listings, so the missing side can skip all the path validation
     for path, a, b in tree:
-        _trigger("on_comparing", SyncEvent(path, processed=processed_items, total=len(tree)))
+        # Giving control back to the event loop (and updating the UI) for each entry is mostly overhead,
+        # and the UI cannot show more than a few updates per second anyway
+        now = monotonic()
+
+        if (now - last_event) >= (1 / EVENTS_RATE):
+            last_event = now
+            _trigger("on_comparing", SyncEvent(path, processed=processed_items, total=total_items))
+            await asyncio.sleep(0)
 
-        direction = ActionDirection.BOTH
-        type = ActionType.NOTHING
+        direction = BOTH
+        type = NOTHING
 
         if a is None:
             # file doesn't exist in source, copy to it
             # TODO: unless it's been deleted
-            a = FileSystemObject(fullpath=src.new_path(path),
-                                 type=b.type,
-                                 size=None,
-                                 mtime=None,
-                                 exists=False,
-                                 hidden=b.hidden)
-            direction = ActionDirection.DST2SRC
-            type = ActionType.COPY
+            a = FileSystemObject.missing(src._new_path_from_listing(path), b.type, b.hidden)
+            direction = DST2SRC
+            type = COPY
         elif b is None:
             # file doesn't exist in destination, copy to it
             # TODO: unless it's been deleted
-            b = FileSystemObject(fullpath=dest.new_path(path),
-                                 type=a.type,
-                                 size=None,
-                                 mtime=None,
-                                 exists=False,
-                                 hidden=a.hidden)
-
-            direction = ActionDirection.SRC2DST
-            type = ActionType.COPY
+            b = FileSystemObject.missing(dest._new_path_from_listing(path), a.type, a.hidden)
+
+            direction = SRC2DST
+            type = COPY
         else:
             # file exists in both side, let's see which one is newer
             if a.size != b.size:
-                type = ActionType.COPY
+                type = COPY
 
-                if a.mtime.timestamp() > b.mtime.timestamp():
-                    direction = ActionDirection.SRC2DST
+                if a.mtime_ns > b.mtime_ns:
+                    direction = SRC2DST
                 else:
-                    direction = ActionDirection.DST2SRC
+                    direction = DST2SRC
 
         # At this point, we will have both a & b for sure (no matter whether they exist or not)
         # This means I can filter them out if necessary
 
-        excluded = filter_set.filter(a) or filter_set.filter(b)
+        excluded = filter_any(a, b)
 
         if excluded:
-            type = ActionType.NOTHING
-
-        match mode:
-            case SyncMode.UPDATE:  # any action destination-to-source is not considered
-                if direction == ActionDirection.DST2SRC:
-                    type = ActionType.NOTHING
-                    direction = ActionDirection.SRC2DST
-                elif direction == ActionDirection.BOTH:
-                    direction = ActionDirection.SRC2DST
-            case SyncMode.MIRROR:
-                if direction == ActionDirection.DST2SRC:
-                    if not a.exists:
-                        type = ActionType.DELETE
-                    else:
-                        type = ActionType.COPY
+            type = NOTHING
 
-                    direction = ActionDirection.SRC2DST
+        type, direction = apply_mode(a, type, direction)
 
-        action = SynchManager.make_action(a, b, type, direction, excluded=excluded)
+        action = make_action(a, b, type, direction, excluded=excluded)
 
-        sync_changes.add_action(action)
+        add_action(action)
 
         processed_items += 1
-        await asyncio.sleep(0)
+
+    # both files of each action come from walking source and destination, no need to check where they are
+    sync_changes.add_actions(actions, validate=False)
 
     await sync_changes.make_all_actions_consistend()
 
     # Flush file info to cache
-    await src.flush_file_object_cache()
-    await dest.flush_file_object_cache()
+    await asyncio.gather(src.flush_file_object_cache(), dest.flush_file_object_cache())
 
     _trigger("after_comparing", SyncEvent(sync_changes))
     return sync_changes
@@ -177,7 +232,7 @@ async def find_dedupe(path: Union[str | FileSystem],
             l = size_organiser.setdefault(size, [])
             l.append(fso)
 
-    size_organiser = {size: sorted(fsos, key=lambda x: x.mtime.timestamp(), reverse=True) for size, fsos in
+    size_organiser = {size: sorted(fsos, key=lambda x: x.mtime_ns, reverse=True) for size, fsos in
                       size_organiser.items() if len(fsos) > 1}
 
     for i, fs_objs in enumerate(size_organiser.values()):
@@ -190,7 +245,8 @@ async def find_dedupe(path: Union[str | FileSystem],
 
             if (await a.get_checksum()) == (await b.get_checksum()):
                 action = SynchManager.make_action(a, b, type=ActionType.DELETE, direction=ActionDirection.SRC2DST)
-                manager.add_action(action)
+                # both files come from walking the same directory
+                manager.add_action(action, validate=False)
 
     _trigger("after_comparing", SyncEvent(manager))
 
@@ -28,6 +28,22 @@ from hashlib import md5
 import json
 import os
 
+try:
+    # orjson is way faster than the standard library at (de)serialising JSON, but it's not mandatory to have it
+    import orjson
+
+    def json_loads(content:Union[str|bytes]) -> Any:
+        return orjson.loads(content)
+
+    def json_dumps(obj:Any) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def json_loads(content:Union[str|bytes]) -> Any:
+        return json.loads(content)
+
+    def json_dumps(obj:Any) -> bytes:
+        return json.dumps(obj).encode()
+
 MNEMONIC_PROGRAM_NAME:str = "RobinHood"
 PROGRAM_NAME:str = MNEMONIC_PROGRAM_NAME.lower()
 
@@ -145,6 +161,10 @@ class RobinHoodConfiguration:
         # Current profile
         this._current_profile:Union[RobinHoodProfile|None] = None
 
+        # Profile settings as last read from the configuration file, with the file's (mtime, size) they refer to
+        # (see read_config_file). This is a singleton initialised several times, so they are kept across initialisations
+        this._config_file_cache:Union[tuple|None] = getattr(this, "_config_file_cache", None)
+
         # Reads the JSON config file
         this.read_config_file()
 
@@ -242,10 +262,15 @@ class RobinHoodConfiguration:
         with open(get_config_file(),'w') as h:
             json.dump(file_dict,h,cls=RobinHoodProfileEncoder)
 
+        # the file has just changed: it must be read again next time, even if its mtime and size look the same
+        this._config_file_cache = None
+
 
     def read_config_file(this) -> None:
         """
-        Loads the configuration file from disk
+        Loads the configuration file from disk.
+        The singleton is initialised several times during a run, so the content of the file is kept and parsed again
+        only when the file changes (ie, its modification time or size are different)
         """
 
         # Gets the configuration fullpath
@@ -253,31 +278,55 @@ class RobinHoodConfiguration:
 
         # If the config file doesn't exist
         # Containing folder(s) will be created
-        if (not config_file.exists()):
+        try:
+            stat = os.stat(config_file)
+        except FileNotFoundError:
             os.makedirs(config_file.parent,exist_ok=True)
             return
 
-        # Reads the config file and decode the json
-        with open(config_file,"r") as h:
-            dict = json.load(h)
+        key = (stat.st_mtime_ns, stat.st_size)
+        cache = this._config_file_cache
+
+        if (cache is not None) and (cache[0] == key):
+            profiles = cache[1]
+        else:
+            # Reads the config file and decode the json
+            # (errors are instances of json.JSONDecodeError, whatever library is used)
+            with open(config_file,"rb") as h:
+                dict = json_loads(h.read())
+
+            profiles = this._parse_config(dict)
+            this._config_file_cache = (key, profiles)
 
-        # if the file is empty or contains no information, let's return
-        if (len(dict)==0): return
+        # for each profile, I create a new RobinHoodProfile object with the parameters contained within
+        # the given dictionary. There is no need to write them back to the file as add_profile would do
+        for name, settings in profiles.items():
+            # same check as add_profile
+            if name in this._cfg:
+                raise ValueError(f"Profile '{name}' already exists")
+
+            this._cfg[name] = RobinHoodProfile(name=name,**settings)
+
+    @staticmethod
+    def _parse_config(dict:Dict[str,Any]) -> Dict[str,Dict[str,Any]]:
+        """
+        Gets the settings of all the profiles from the decoded configuration file
+
+        :param dict: The content of the configuration file
+        :return: A dictionary where the key is the name of the profile and the value its settings
+        """
+
+        # if the file is empty or contains no information, there are no profiles
+        if (len(dict)==0): return {}
 
         # Manages specific cases in case of config files generated from previous versions
         match dict['version']:
             case "0.1":
                 # if the key profiles exists
-                if "profiles" in dict:
-                    # for each profile, I create a new RobinHoodProfile object with the parameters contained within
-                    # the given dictionary
-                    for name, settings in dict['profiles'].items():
-                        this.add_profile(name,RobinHoodProfile(name=name,**settings))
+                return dict.get("profiles", {})
             case _:
                 raise ValueError(f"Unsupported version {dict['version']}")
 
-
-
     def get_profiles(this) -> Dict[str,RobinHoodProfile]:
         """
         Returns all the profiles
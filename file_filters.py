@@ -1,5 +1,7 @@
 from typing import Iterable,Callable, Union
-from fnmatch import fnmatch
+from fnmatch import translate
+import os
+import re
 from abc import ABC, abstractmethod
 from filesystem import FileSystemObject
 class FileFilter(ABC):
@@ -41,8 +43,11 @@ class UnixPatternExpasionFilter(FileFilter):
         super().__init__()
         this._pattern:str = pattern
 
+        # Same as fnmatch does (case is normalised according to the OS), but the pattern is translated only once
+        this._regex:re.Pattern = re.compile(translate(os.path.normcase(pattern)))
+
     def filter(this,fso:FileSystemObject) -> bool:
-        return fnmatch(fso.absolute_path,this.pattern)
+        return this._regex.match(os.path.normcase(fso.absolute_path)) is not None
 
     @property
     def pattern(this) -> str:
@@ -75,4 +80,17 @@ class FilterSet:
             for filter in this.filters:
                 if (filter(file)): return True
 
-        return False
\ No newline at end of file
+        return False
+
+    def filter_any(this, *files:Union[FileSystemObject|None]) -> bool:
+        '''
+        Same as calling filter on each file, but in one go (eg, both sides of a comparison)
+        :param files: The file system objects to check
+        :return: TRUE if any of the files is filtered out, FALSE otherwise
+        '''
+
+        # Nothing to filter out
+        if len(this.filters) == 0:
+            return False
+
+        return any(this.filter(file) for file in files)
\ No newline at end of file
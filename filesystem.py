@@ -26,26 +26,64 @@ from abc import ABC, abstractmethod
 from enum import Enum
 from rclone_python import rclone
 from datetime import datetime
-from copy import copy
-from psutil import disk_partitions
-from config import get_cache_file
+from functools import lru_cache
+from config import get_cache_file, json_loads, json_dumps
 from pyrclone.pyrclone import rclone
-from pyrclone.pyrclone.jobs import _fix_isotime
 from concurrent.futures import ProcessPoolExecutor
 import asyncio
 import os
-import json
 import aiofiles
+import re
+import sys
 
 
 # Checks whether RH is running under windows or not
 is_windows = lambda: os.name == 'nt'
 
+# The OS is not going to change while RH is running
+_IS_WINDOWS = is_windows()
+
 # Gets the current time zone (useful to get rid of naive datetime)
 current_timezone = lambda: datetime.now().astimezone().tzinfo
 
 UNITS = ("", "K", "M", "G", "T", "P", "E", "Z")
 
+# How long (in seconds) the list of local/remote partitions is considered valid
+PARTITIONS_TTL = 30
+
+# How long (in seconds) the list of rclone remotes is considered valid
+REMOTES_TTL = 60
+
+# How many normalised paths are remembered (per path manager)
+NORMALISE_CACHE_SIZE = 65536
+
+
+# Fractional seconds followed by the UTC offset (eg .123456789+01:00)
+_ISOTIME_RE = re.compile(r"(\.[0-9]*)(?=[+-][0-9]{2}:[0-9]{2})")
+
+
+def _fix_isotime(timestamp: str) -> str:
+    """
+    Some remotes (eg mega.nz) give timestamps with more than 6 digits for the fractional seconds, which
+    datetime.fromisoformat can't parse. This function truncates them to microseconds
+    :param timestamp: A timestamp in ISO format
+    :return: The same timestamp with at most 6 digits for the fractional seconds
+    """
+    return _ISOTIME_RE.sub(lambda m: m.group(1)[:7], timestamp)
+
+
+if sys.version_info >= (3, 11):
+    # From Python 3.11, fromisoformat parses any number of digits for the fractional seconds by itself
+    _parse_isotime = datetime.fromisoformat
+else:
+    def _parse_isotime(timestamp: str) -> datetime:
+        """
+        Parses a timestamp in ISO format as given by rclone
+        :param timestamp: A timestamp in ISO format
+        :return: A datetime object
+        """
+        return datetime.fromisoformat(_fix_isotime(timestamp))
+
 
 def rclone_instance() -> rclone:
     if not hasattr(rclone_instance, "_instance"):
@@ -56,6 +94,21 @@ def rclone_instance() -> rclone:
     return rclone_instance._instance
 
 
+async def get_rclone_remotes() -> List[Tuple[str, str]]:
+    """
+    Gets the remotes configured in rclone. The list is kept for REMOTES_TTL seconds, as this is checked quite often
+    (eg, for each file system object asked whether it is remote)
+    :return: A list of tuples containing the type and the drive of each remote
+    """
+    now = time.monotonic()
+
+    if (not hasattr(get_rclone_remotes, "_remotes")) or (now - get_rclone_remotes._timestamp > REMOTES_TTL):
+        get_rclone_remotes._remotes = await rclone_instance().list_remotes()
+        get_rclone_remotes._timestamp = now
+
+    return get_rclone_remotes._remotes
+
+
 def sizeof_fmt(num: int, suffix: str = "B") -> str:
     '''
     Formats an integer representing the size of a file into something more human-readable format
@@ -125,6 +178,9 @@ class AbstractPath(ABC):
     PATH_SEPARATOR = '/'
     VOLUME_SEPARATOR = ":"
 
+    # Every file system object has its own path, so no __dict__ for them either
+    __slots__ = ('_basepath', '_path', '_relpath_cache')
+
     def __init__(this, path: str, root: Union[str | None] = None):
         '''
         Instantiate a new path
@@ -134,6 +190,9 @@ class AbstractPath(ABC):
                      If not provided, then root = path
         '''
 
+        # (path, root, relative path) - see relative_path property
+        this._relpath_cache: Union[Tuple[str, str, str] | None] = None
+
         # Converts the root path (if provided) considering special directories .. and .
         this._basepath = this.normalise(path if root is None else root)
 
@@ -192,30 +251,43 @@ class AbstractPath(ABC):
         if (len(paths) == 0):
             return None
 
-        r = paths[0]
+        sep = cls.PATH_SEPARATOR
+
+        # Path parts are collected in a list and concatenated only once at the end
+        parts = [paths[0]]
+        # Whether the path built so far ends with a slash
+        xx = paths[0][-1:] == sep
 
         for i in range(1, len(paths)):
+            p = paths[i]
+
             # To avoid to have double slashes, each path part is checked whether they end/start with slash
-            xx = r.endswith(cls.PATH_SEPARATOR)
-            yy = paths[i].startswith(cls.PATH_SEPARATOR)
+            yy = p[:1] == sep
 
             # The operator ^ is the XOR operator.
             # If either of them have a slash, I simply concatenate them
             if (xx ^ yy):
-                r += paths[i]
+                parts.append(p)
             elif (xx and yy):
                 # if both have a slash, I remove the slash from the second part
-                r += paths[i].lstrip(" /")
+                p = p.lstrip(" /")
+                parts.append(p)
             else:
                 # if neither of them has a slash, it's added
-                if (cls.is_relative(paths[i])):
-                    r += cls.PATH_SEPARATOR + paths[i]
+                if (cls.is_relative(p)):
+                    parts.append(sep)
+                    parts.append(p)
+                    xx = True
                 else:
                     # in the case a path part is an absolute path, well, everything done so far gets wiped out
-                    r = paths[i]
+                    parts = [p]
+
+            # empty parts don't change how the path ends
+            if len(p) > 0:
+                xx = p[-1:] == sep
 
         # Returns the merged path
-        return r
+        return "".join(parts)
 
     @classmethod
     def is_special_dir(cls, d: str) -> bool:
@@ -226,6 +298,29 @@ class AbstractPath(ABC):
         '''
         return (d == ".") or (d == "..")
 
+    @classmethod
+    def resolve_special_dirs(cls, tokens: List[str], min_idx: int = 0) -> List[str]:
+        """
+        Removes the special directories . and .. from a split path in a single pass (like a stack)
+        A . is kept only if it is the first token, a .. removes itself and the token before (if any)
+        :param tokens: The split path (see `split`)
+        :param min_idx: Number of leading tokens that cannot be removed by ..
+        :return: A new list of tokens without special directories
+        """
+        if len(tokens) == 0:
+            return tokens
+
+        resolved = [tokens[0]] if tokens[0] != ".." else []
+
+        for t in tokens[1:]:
+            if t == "..":
+                if len(resolved) > min_idx:
+                    resolved.pop()
+            elif t != ".":
+                resolved.append(t)
+
+        return resolved
+
     @classmethod
     def is_absolute(cls, path: str) -> bool:
         """
@@ -272,7 +367,16 @@ class AbstractPath(ABC):
         if cls.is_relative(path):
             return True
 
-        spath = cls.split(cls.normalise(path))
+        path = cls.normalise(path)
+
+        # Most of the times the path simply starts with the root: no need to split anything
+        if path.startswith(root):
+            n = len(root)
+            if (len(path) == n) or (root[n - 1:] == cls.PATH_SEPARATOR) or (path[n] == cls.PATH_SEPARATOR):
+                return True
+
+        # Otherwise, paths are compared token by token (the first one isn't case-sensitive, think of volumes)
+        spath = cls.split(path)
         sroot = cls.split(root)
 
         if (len(sroot) <= len(spath)):
@@ -288,8 +392,28 @@ class AbstractPath(ABC):
         else:
             return False
 
+    @classmethod
+    def construct(cls, path: str, root: str) -> AbstractPath:
+        '''
+        Makes a new path object without any normalisation or validation.
+        Use it only when both paths are known to be absolute, normalised, and path is rooted in root.
+        :param path: An absolute normalised path
+        :param root: An absolute normalised path, root of the previous one
+        :return: A new path object
+        '''
+        obj = cls.__new__(cls)
+        obj._basepath = root
+        obj._path = path
+        obj._relpath_cache = None
+
+        return obj
+
     def __copy__(this) -> AbstractPath:
-        return type(this)(path=this.absolute_path, root=this.root)
+        # this object has been validated already, no need to do that again for its copy
+        c = this.construct(this._path, this._basepath)
+        c._relpath_cache = this._relpath_cache
+
+        return c
 
     def __str__(this) -> str:
         return this.relative_path
@@ -297,15 +421,28 @@ class AbstractPath(ABC):
     def __repr__(this) -> str:
         return this.absolute_path
 
-    @property
     @abstractmethod
-    def relative_path(this) -> str:
+    def _relative_path(this) -> str:
         """
-        Abstract property to retrieve the relative path
+        Abstract method to calculate the relative path
         :return: The relative path
         """
         pass
 
+    @property
+    def relative_path(this) -> str:
+        """
+        Gets the relative path. As it's used as key (eg hashing file system objects), it's calculated only when
+        either the path or the root have changed
+        :return: The relative path
+        """
+        c = this._relpath_cache
+
+        if (c is None) or (c[0] is not this._path) or (c[1] is not this._basepath):
+            c = this._relpath_cache = (this._path, this._basepath, this._relative_path())
+
+        return c[2]
+
     @property
     def absolute_path(this) -> str:
         '''
@@ -372,7 +509,7 @@ class AbstractPath(ABC):
         :return: A new object rooted in the same  root but with the path provided as parameter
         '''
 
-        c = copy(this)
+        c = this.__copy__()
         c.cd(path)
         return c
 
@@ -408,6 +545,10 @@ class FileSystemObject:
     This class represents any suitable object in a file system (in our case, mainly regular files and directories)
     '''
 
+    # There can be hundreds of thousands of these objects in a tree, so no __dict__ for them
+    __slots__ = ('fullpath', 'type', '_size', '_mtime', '_mtime_ns', 'hidden', '_exists', '_checksum', '_is_empty',
+                 '_split')
+
     def __init__(this,
                  fullpath: Union[AbstractPath | None],
                  *,
@@ -429,10 +570,14 @@ class FileSystemObject:
         this.type = type
         this._size = size
         this._mtime = mtime
+        # Modification time as an integer (see mtime_ns)
+        this._mtime_ns: Union[int | None] = None
         this.hidden = hidden
         this._exists = exists
         this._checksum = checksum
         this._is_empty = None
+        # (absolute path, containing directory, filename) - see _split_path
+        this._split: Union[Tuple[str, str, str] | None] = None
 
     @property
     def absolute_path(this) -> str:
@@ -444,22 +589,34 @@ class FileSystemObject:
         """Gets the relative path of the fs object"""
         return this.fullpath.relative_path
 
+    def _split_path(this) -> Tuple[str, str, str]:
+        """
+        Splits the absolute path into containing directory and filename. The result is kept until the path changes
+        :return: A tuple containing the absolute path, the containing directory and the filename
+        """
+        path = this.absolute_path
+
+        if (this._split is None) or (this._split[0] != path):
+            this._split = (path, *os.path.split(path))
+
+        return this._split
+
     @property
     def containing_directory(this) -> str:
         """Gets the containing directory of the FS object (extracted from its absolute path)"""
-        return os.path.split(this.absolute_path)[0]
+        return this._split_path()[1]
 
     @property
     def filename(this) -> str:
         """Gets the file- or directory name of the fs object"""
-        return os.path.split(this.absolute_path)[1]
+        return this._split_path()[2]
 
     async def is_remote(this) -> bool:
         """
         Checks if the fs object is rooted in a remote drive (doesn't check if it exists remotely)
         :return: TRUE if it's in any of the remote drives, FALSE otherwise
         """
-        for _, drive in (await rclone_instance().list_remotes()):
+        for _, drive in (await get_rclone_remotes()):
             if this.absolute_path.startswith(drive):
                 return True
         return False
@@ -469,7 +626,7 @@ class FileSystemObject:
         Checks if the fs object is rooted in a local drive (doesn't check if it exists remotely)
         :return: TRUE if it's in any of the local drives, FALSE otherwise
         """
-        return not this.is_remote
+        return not (await this.is_remote())
 
     @property
     def size(this) -> Union[int | None]:
@@ -506,6 +663,19 @@ class FileSystemObject:
 
         return this._mtime
 
+    @property
+    def mtime_ns(this) -> Union[int | None]:
+        """
+        Gets the modification time of the filesystem object as nanoseconds since the epoch.
+        Comparing integers is way cheaper than converting datetimes to timestamps each time, so the conversion is done
+        once (the first time it's needed)
+        """
+        if (this._mtime_ns is None) and (this._mtime is not None):
+            # datetime has microsecond resolution, so rounding doesn't lose anything
+            this._mtime_ns = round(this._mtime.timestamp() * 1_000_000) * 1000
+
+        return this._mtime_ns
+
     # @property
     # def is_empty(this) -> bool:
     #     if this.type != FileType.DIR:
@@ -529,6 +699,7 @@ class FileSystemObject:
         """
         this._mtime = mtime if (mtime is None) or (mtime.tzinfo is not None) else mtime.replace(
             tzinfo=current_timezone())
+        this._mtime_ns = None
 
     @property
     def has_checksum(this) -> bool:
@@ -585,34 +756,51 @@ class FileSystemObject:
     def __repr__(this) -> str:
         return str(this)
 
-    async def update_information(this) -> None:
-        """Update the information about the file system object, eg size, modificafion time and its existance"""
+    async def update_information(this, stat: Union[Dict[str, Any] | None] = None) -> None:
+        """
+        Update the information about the file system object, eg size, modificafion time and its existance
+        :param stat: The information about this object as listed by rclone (if already known). If None, rclone is
+                     asked for it
+        """
 
         # Using rclone is the best way to have this information formated in the  same way, regardless if we have a local
         # or remote file/directory
-        stat = await rclone_instance().stat(this.fullpath.root, this.fullpath.relative_path)
+        if stat is None:
+            stat = await rclone_instance().stat(this.fullpath.root, this.fullpath.relative_path)
 
         # If rclone returns code is non-zero, then the object doesn't exist
         if stat is not None:
             # If it does exist, then the new information are used to update the current object status
             this._size = stat['Size']
-            this.mtime = datetime.fromisoformat(_fix_isotime(stat['ModTime']))
+            this.mtime = _parse_isotime(stat['ModTime'])
             this._exists = True
         else:
             this._exists = False
 
     def to_dict(this) -> Dict[str, Any]:
-        print()
+        mtime = this._mtime
+
         return {
-            "path": this.relative_path,
+            "path": this.fullpath.relative_path,
             "type": this.type.value,
             "size": this.size,
-            "mtime": this.mtime.timestamp(),
-            "exists": this.exists,
+            "mtime": mtime.timestamp() if mtime is not None else None,
+            "exists": this._exists,
             "checksum": this._checksum,
             "hidden": this.hidden
         }
 
+    @classmethod
+    def missing(cls, fullpath: AbstractPath, type: FileType, hidden: bool = False) -> FileSystemObject:
+        """
+        Makes an object standing for something that doesn't exist (eg, a file on one side of a comparison only)
+        :param fullpath: Where the object would be
+        :param type: Type of the file (see `FileType` enumeration)
+        :param hidden: TRUE if it's a hidden file, FALSE otherwise
+        :return: A FileSystemObject that doesn't exist
+        """
+        return cls(fullpath, type=type, exists=False, hidden=hidden)
+
     @classmethod
     def from_dict(cls, d: Dict[str, Any], *, mtime: Union[int | None] = None) -> FileSystemObject:
 
@@ -652,6 +840,8 @@ class PosixAbstractPath(AbstractPath):
     It's required to adapt a few things to make it work with POSIX paths
     """
 
+    __slots__ = ()
+
     def __init__(this, path: str, root: Union[str | None] = None):
         bp = this.normalise(path if root is None else root)
         path = this.normalise(path)
@@ -665,23 +855,20 @@ class PosixAbstractPath(AbstractPath):
         super().__init__(path, bp)
 
     @classmethod
+    @lru_cache(maxsize=NORMALISE_CACHE_SIZE)
     def normalise(cls, path: str) -> str:
+        # Paths in the same tree share most of their directories, so the same strings get normalised over and over
         path = super(PosixAbstractPath, PosixAbstractPath).normalise(path)
         tokens = cls.split(path)
 
-        tokens[1:] = [t for t in tokens[1:] if t != "."]
-
-        while ".." in tokens:
-            idx = tokens.index("..")
-            del tokens[max(idx - 1, 0):idx + 1]
+        tokens = cls.resolve_special_dirs(tokens)
 
         if (tokens is None) or (len(tokens) == 0):
             return cls.PATH_SEPARATOR
 
         return cls.join(tokens)
 
-    @property
-    def relative_path(this) -> str:
+    def _relative_path(this) -> str:
         path = this.absolute_path
 
         if (this.root_is_parent_of(path)):
@@ -702,6 +889,8 @@ class NTAbstractPath(AbstractPath):
     It's required to adapt a few things to make it work with NT paths
     """
 
+    __slots__ = ()
+
     @classmethod
     def get_volume(cls, path: str) -> [str | None]:
         """
@@ -734,19 +923,17 @@ class NTAbstractPath(AbstractPath):
         return super(NTAbstractPath, NTAbstractPath).is_absolute(path)
 
     @classmethod
+    @lru_cache(maxsize=NORMALISE_CACHE_SIZE)
     def normalise(cls, path):
         path = super(PosixAbstractPath, PosixAbstractPath).normalise(path)
         tokens = cls.split(path)
 
-        tokens[1:] = [t for t in tokens[1:] if t != "."]
-
         vol = cls.get_volume(path)
 
+        # The volume cannot be removed by ..
         min_idx = 1 if (vol is not None) and tokens[0].startswith(vol) else 0
 
-        while ".." in tokens:
-            idx = tokens.index("..")
-            del tokens[max(idx - 1, min_idx):idx + 1]
+        tokens = cls.resolve_special_dirs(tokens, min_idx)
 
         return cls.join(tokens)
 
@@ -760,8 +947,7 @@ class NTAbstractPath(AbstractPath):
 
         return tokens
 
-    @property
-    def relative_path(this):
+    def _relative_path(this):
         path = this.absolute_path
         if (this.root_is_parent_of(path)):
             path = path[len(this.root):]
@@ -811,6 +997,8 @@ class FileSystem(ABC):
 
         this._cached = cached
         this._cache = dict()
+        # Same content as the cache, indexed by path (with a leading slash)
+        this._cache_index: Dict[str, Any] = {}
 
 
     async def _find_dir_in_cache(this, dir: str) -> Union[Any | None]:
@@ -822,12 +1010,9 @@ class FileSystem(ABC):
 
         dir_to_search = this.new_path(dir, root=this.base_path).relative_path
 
-        for itm in this._cache:
-            remote_path = "/" + itm['Path']
-            if (remote_path == dir) or (remote_path == dir_to_search):
-                return itm
+        itm = this._cache_index.get(dir)
 
-        return None
+        return itm if itm is not None else this._cache_index.get(dir_to_search)
 
 
     async def ls(this, path: Union[str | None] = None) -> Iterable[FileSystemObject]:
@@ -839,27 +1024,31 @@ class FileSystem(ABC):
         cp = this.current_path if path is None else path
         cp = this.new_path(cp, root=this.base_path)
 
-        content = [await this._make_filesystem_object(x, cp.relative_path) for x in (await this._dir(cp))]
+        content = [await this._make_filesystem_object(x) for x in (await this._dir(cp))]
 
         return content
 
-    async def _make_filesystem_object(this, dic: dict, path: str) -> FileSystemObject:
+    async def _make_filesystem_object(this, dic: dict) -> FileSystemObject:
+        """
+        Makes a file system object from an item listed by rclone
+        :param dic: The json object (as dictionary) given by rclone
+        :return: A FileSystemObject representing the listed item
+        """
         type = FileType.DIR if dic['IsDir'] else FileType.REGULAR
 
-        fullpath = this.new_path(AbstractPath.join(path, dic['Name']), root=this.root)
+        fullpath = this._new_path_from_listing(dic['Path'])
 
         if (this.cached):
             cached_fso = this._get_fso_from_cache(fullpath)
             if (cached_fso is not None):
-                await cached_fso.update_information()
+                # dic comes from the listing already, no need to ask rclone about this object again
+                await cached_fso.update_information(dic)
                 return cached_fso
 
-        mod_time = _fix_isotime(dic['ModTime'])  # fixing mega.nz bug
-
         fso = FileSystemObject(fullpath,
                                type=type,
                                size=dic['Size'],
-                               mtime=datetime.fromisoformat(mod_time),
+                               mtime=_parse_isotime(dic['ModTime']),
                                exists=True)
 
         if this.cached:
@@ -877,20 +1066,13 @@ class FileSystem(ABC):
         :return: A list of dictonaries representing the json result from rclone
         """
 
-        dir = []
-
         items = this._cache if this.cached else (await rclone_instance().ls(path.root, path.relative_path))
         relpath = path.relative_path
 
         if (relpath == "."): relpath = ""
 
-        for itm in items:
-            p, tail = os.path.split(itm['Path'])
-
-            if (p == relpath):
-                dir.append(itm)
-
-        return dir
+        # A single pass over the listing, without building the list up one append at a time
+        return [itm for itm in items if os.path.split(itm['Path'])[0] == relpath]
 
 
     async def exists(this, filename) -> bool:
@@ -917,7 +1099,7 @@ class FileSystem(ABC):
 
         for itm in content:
             if itm['Name'] == name:
-                return await this._make_filesystem_object(itm, parent_path.absolute_path)
+                return await this._make_filesystem_object(itm)
 
         raise FileNotFoundError(f"No such file or directory: '{path}'")
 
@@ -1003,14 +1185,17 @@ class FileSystem(ABC):
     async def _load_previous_file_system_objects_cache(this) -> None:
         cache_filename = get_cache_file(this.root)
 
-        if not os.path.exists(cache_filename):
+        try:
+            async with aiofiles.open(cache_filename, mode='rb') as h:
+                content = await h.read()
+        except FileNotFoundError:
+            # No previous run for this root
             return
 
-        async with aiofiles.open(cache_filename, mode='r') as h:
-            content = await h.read()
-            d = json.loads(content)
-            if d['root'] != this.root:
-                return
+        d = json_loads(content)
+
+        if d['root'] != this.root:
+            return
 
         files = d.setdefault('files', [])
 
@@ -1059,6 +1244,7 @@ class FileSystem(ABC):
             if (this._tree_cache is None) or (len(this._tree_cache) == 0):
                 if (not this.cached) or force:
                     this._cache = await rclone_instance().ls(this.base_path, "", recursive=True)
+                    this._cache_index = {"/" + itm['Path']: itm for itm in this._cache}
 
     def cd(this, path) -> None:
         """
@@ -1118,11 +1304,7 @@ class FileSystem(ABC):
         '''
 
         for itm in this._cache:
-            path, _ = os.path.split(itm['Path'])
-            if len(path) == 0:
-                path = './'
-
-            yield await this._make_filesystem_object(itm, this.new_path(path).absolute_path)
+            yield await this._make_filesystem_object(itm)
 
         # dirs = [cwd]
         #
@@ -1146,6 +1328,18 @@ class FileSystem(ABC):
         """
         return this._path_manager(path, root if root is not None else this.root)
 
+    def _new_path_from_listing(this, path: str) -> AbstractPath:
+        """
+        Same as `new_path`, but only for paths listed by rclone. These are already relative to the root of the file
+        system and have no special directories, so they can skip all the checks done by `new_path`.
+        :param path: The path (relative to this.root) of an item listed by rclone
+        :return: An *AbstractPath object representing path
+        """
+        pm = this._path_manager
+        root = this.root
+
+        return pm.construct(pm.join(root, pm.as_posix(path)), root)
+
     async def flush_file_object_cache(this) -> None:
         """
         Flushes changes of the file system objects into cache
@@ -1161,14 +1355,20 @@ class FileSystem(ABC):
 
             if (previous is not None) and (current is not None):
                 if (previous.type == FileType.REGULAR) and (current.type==FileType.REGULAR):
-                    if (previous.mtime.timestamp() == current.mtime.timestamp()) and \
+                    if (previous.mtime_ns == current.mtime_ns) and \
                             (previous.size == current.size) and \
                             previous.has_checksum and (not current.has_checksum):
                         current.checksum = previous.checksum
 
-        keys = sorted(this._file_objects_cache.keys(), key=lambda path: (len(AbstractPath.split(path)), path))
+        # Keys are relative paths (no leading, trailing or double slashes), so their depth is just a count of separators
+        sep = AbstractPath.PATH_SEPARATOR
+        keys = sorted(this._file_objects_cache.keys(), key=lambda path: (path.count(sep), path))
 
-        fsos = [this._file_objects_cache[k].to_dict() for k in keys]
+        # binding these locally saves a couple of attribute lookups per file
+        cache = this._file_objects_cache
+        to_dict = FileSystemObject.to_dict
+
+        fsos = [to_dict(cache[k]) for k in keys]
 
         cache_filename = get_cache_file(this.root)
 
@@ -1177,8 +1377,8 @@ class FileSystem(ABC):
         if not os.path.exists(parent):
             os.makedirs(parent, exist_ok=True)
 
-        async with aiofiles.open(cache_filename, mode="w") as h:
-            content = json.dumps({
+        async with aiofiles.open(cache_filename, mode="wb") as h:
+            content = json_dumps({
                 "root": this.root,
                 "timestamp": datetime.now().timestamp(),
                 "files": fsos
@@ -1190,7 +1390,7 @@ class LocalFileSystem(FileSystem):
 
     def __init__(this, *args, **kwargs):
         if ("path_manager" not in kwargs) or (kwargs['path_manager'] is None):
-            kwargs['path_manager'] = NTAbstractPath if is_windows() else PosixAbstractPath
+            kwargs['path_manager'] = NTAbstractPath if _IS_WINDOWS else PosixAbstractPath
 
         super().__init__(*args, **kwargs)
 
@@ -1206,6 +1406,41 @@ class RemoteFileSystem(FileSystem):
 
 
 
+async def _get_partitions() -> Tuple[re.Pattern, Dict[str, bool]]:
+    """
+    Gets all the known partitions (rclone drives + local drives) as a single case-insensitive pattern matching the
+    beginning of a path. As this is called by the autocompletion (ie, for each keystroke), the result is kept for
+    PARTITIONS_TTL seconds
+    :return: A tuple containing the compiled pattern and a dictionary telling (for each lowercase partition) whether
+             it is a rclone drive
+    """
+
+    now = time.monotonic()
+
+    if (not hasattr(_get_partitions, "_cache")) or (now - _get_partitions._timestamp > PARTITIONS_TTL):
+        if (_IS_WINDOWS):
+            # psutil is only needed here, so there's no point in importing it on other platforms
+            from psutil import disk_partitions
+
+            local_drives = [p.device.replace("\\", AbstractPath.PATH_SEPARATOR) for p in disk_partitions() if
+                            p.fstype != "" and p.mountpoint != ""]
+        else:
+            local_drives = ['/']
+
+        partitions = {d.lower(): False for d in local_drives}
+        # rclone drives are added after the local ones, so they win if (for any weird reason) the names clash
+        partitions.update({drive.lower(): True for _, drive in (await get_rclone_remotes())})
+
+        # Longer partitions first, so that a partition being the prefix of another one doesn't shadow it
+        alternatives = sorted(partitions.keys(), key=len, reverse=True)
+        pattern = re.compile("|".join(re.escape(p) for p in alternatives), re.IGNORECASE)
+
+        _get_partitions._cache = (pattern, partitions)
+        _get_partitions._timestamp = now
+
+    return _get_partitions._cache
+
+
 async def fs_auto_determine(path: str, parse_all: bool = False) -> FileSystem:
     '''
     Automatically determine if the provided path is a local or remote root path
@@ -1216,26 +1451,15 @@ async def fs_auto_determine(path: str, parse_all: bool = False) -> FileSystem:
     '''
     head, tail = os.path.split(path)
 
-    rclone_drives = [drive for _, drive in (await rclone_instance().list_remotes())]
-    rclone_drives += [r.lower() for r in rclone_drives]
-
-    partitions = rclone_drives.copy()
-
-    if (is_windows()):
-        local_drives = [p.device.replace("\\", AbstractPath.PATH_SEPARATOR) for p in disk_partitions() if
-                        p.fstype != "" and p.mountpoint != ""]
-        partitions += local_drives + [r.lower() for r in local_drives]
-    else:
-        partitions += ['/']
+    pattern, partitions = await _get_partitions()
 
     fullpath = path if parse_all else head
 
-    for p in partitions:
-        if fullpath.startswith(p):
-            if p in rclone_drives:
-                return RemoteFileSystem(fullpath)
-            else:
-                return LocalFileSystem(fullpath)
+    if (m := pattern.match(fullpath)) is not None:
+        if partitions[m.group(0).lower()]:
+            return RemoteFileSystem(fullpath)
+        else:
+            return LocalFileSystem(fullpath)
 
 
 async def fs_autocomplete(path: str, min_chars: int = 3) -> Union[str | None]:
@@ -1257,7 +1481,15 @@ async def fs_autocomplete(path: str, min_chars: int = 3) -> Union[str | None]:
                 return obj.absolute_path
 
 async def synched_walk(source:FileSystem, destination:FileSystem) \
-        -> AsyncIterable[Tuple[str,Union[FileSystemObject|None],Union[FileSystemObject|None]]]:
+        -> Tuple[int, Iterable[Tuple[str,Union[FileSystemObject|None],Union[FileSystemObject|None]]]]:
+    '''
+    Walks source and destination together. Both trees are collected first, so the number of items is known beforehand
+
+    :param source: Source file system
+    :param destination: Destination file system
+    :return: A tuple containing the number of items and an iterable of (path, source object, destination object),
+             where any of the two objects is None if it doesn't exist on that side
+    '''
 
     #async def _
 
@@ -1268,16 +1500,5 @@ async def synched_walk(source:FileSystem, destination:FileSystem) \
 
     all_files = sorted(all_files,key=_tree_sort_fn)
 
-    for path in all_files:
-        try:
-            src = src_tree[path]
-        except KeyError:
-            src = None
-
-        try:
-            dst = dst_tree[path]
-        except KeyError:
-            dst = None
-
-        yield path, src, dst
+    return len(all_files), ((path, src_tree.get(path), dst_tree.get(path)) for path in all_files)
 
@@ -1,19 +1,46 @@
-from typing import Optional
+import time
+from typing import Optional, Tuple
 from rich.console import Console, RenderableType, JustifyMethod
 from rich.text import Text
 from rich.style import Style
+from rich.color import ColorSystem
 
 BACKGROUND = Style(color="white", bgcolor="#333333")
 BAR = Style(color="black", bgcolor="#0087d7")
 CURSOR = Style(color="black", bgcolor="#00afff")
 
+# Colour systems as named by the Rich console
+COLOR_SYSTEMS = {
+    "standard": ColorSystem.STANDARD,
+    "256": ColorSystem.EIGHT_BIT,
+    "truecolor": ColorSystem.TRUECOLOR,
+    "windows": ColorSystem.WINDOWS
+}
+
+# Characters needed to draw the borders of the progress bar
+PADDING = 2
+
+# Max number of times per second the progress bar is printed. Terminals can't keep up with more than that anyway
+REFRESH_RATE = 30
+
+def shared_console() -> Console:
+    '''
+    Gets the console shared by all the progress bars (created the first time it's needed)
+    :return: A console from the Rich library
+    '''
+    if not hasattr(shared_console, "_instance"):
+        shared_console._instance = Console()
+
+    return shared_console._instance
+
 class HighlightedProgressBar:
 
     def __init__(this, total:Optional[float]=None,
                        size:Optional[int]=None,
                        background:Style=BACKGROUND,
                        bar:Style=BAR,
-                       cursor:Style=CURSOR):
+                       cursor:Style=CURSOR,
+                       console:Optional[Console]=None):
         '''
         Initialise a highlighted progress bar
 
@@ -22,10 +49,12 @@ class HighlightedProgressBar:
         :param background: background colour (unfilled)
         :param bar: Bar colour (filled background)
         :param cursor: Colour of the cursor (it shows when smaller increment)
+        :param console: The console where to print the progress bar. If None, a console shared by all the progress
+                        bars is used
         '''
 
-        #make a new console from Rich library
-        this.console = Console()
+        #making a console from Rich library means probing the terminal, so all the progress bars share the same one
+        this.console = console if console is not None else shared_console()
 
         #check if the size is not not and, if it's not, check if it's a positive number
         if size is not None:
@@ -44,14 +73,24 @@ class HighlightedProgressBar:
 
         #intialise the current status at 0 and total units
         this._current:float = 0
-        #if total is none, 100 would be default
-        this.total:float = 100 if total is None else total
+        #if total is none, 100 would be default (the setter works out the percentage as well, see _progress method)
+        this.total = 100 if total is None else total
 
         # A label to show (if any) - That's the reason I am doing all of this
         this.label:str = ""
         # And where to align it
         this.alignment:JustifyMethod = 'left'
 
+        # When the progress bar was printed last time and what it looked like (see print method)
+        this._last_print:float = 0
+        this._last_frame:Optional[Tuple] = None
+
+        # The label with the percentage in place (see _frame method)
+        this._label_cache:Optional[Tuple[Tuple[str, int], str]] = None
+
+        # The empty progress bar (see render method)
+        this._background:Optional[Tuple[Tuple, Text]] = None
+
     @property
     def finished(this) -> bool:
         '''
@@ -68,13 +107,50 @@ class HighlightedProgressBar:
         """
         return this._size
 
+    @property
+    def total(this) -> float:
+        '''
+        Total number of units the progress bar counts
+        :return: A float with the total number of units
+        '''
+        return this._total
+
+    @total.setter
+    def total(this, value:float) -> None:
+        this._total = value
+        this._progress()
+
     @property
     def get_percentage(this) -> float:
         '''
-        Calculates the percentage of the progression
+        Gets the percentage of the progression
         :return: A float from 0 to 1
         '''
-        return this._current / this.total
+        return this._percentage
+
+    def _progress(this) -> None:
+        '''
+        Works out the percentage of the progression and how many characters need to be filled.
+        This is done only when the progress bar moves, so that rendering doesn't need to do any maths
+        '''
+        # nothing to count (yet), nothing to fill
+        this._percentage = (this._current / this._total) if this._total else 0
+
+        #size property will indicate the whole size of the progress bar,
+        #However the label cannot be of that size because I need two characters
+        #to render something resembling a box.
+        inner_width = this.width - PADDING
+
+        #at this point, I calculate the number of characters needed to be filled with the given
+        #progress bar percentage
+        completed_characters = this._percentage * inner_width
+
+        #this number must be round
+        this._filled = int(completed_characters)
+
+        #this extra variable calculates how much left is to fill the next character.
+        #If a certain threshold is reached, a cursor is shown
+        this._cursor = (completed_characters < inner_width) and ((completed_characters - this._filled) >= 0.5)
 
     def advance(this,delta:float, label:Optional[str] = None) -> None:
         '''
@@ -90,6 +166,8 @@ class HighlightedProgressBar:
         if this._current > this.total:
             this._current = this.total
 
+        this._progress()
+
         this.label = label if label is not None else ""
 
     def update(this,value:float, label:Optional[str] = None) -> None:
@@ -104,8 +182,28 @@ class HighlightedProgressBar:
         # it's always good to check if we are overshooting...
         this._current = value if value < this.total else this.total
 
+        this._progress()
+
         this.label = label if label is not None else ""
 
+    def _frame(this) -> Tuple[str, int, bool]:
+        '''
+        Works out what the progress bar looks like at the moment, ie the label, the number of filled characters and
+        whether the cursor is visible. Two identical frames produce the same exact output
+
+        :return: A tuple containing the label (with the percentage in place), the number of filled characters and
+                 whether the cursor is visible
+        '''
+        # The label can have a placeholder to show the percentage, which is to percentage signs %%
+        # The percentage only changes 100 times, so the label is replaced only when that happens (or the label changes)
+        key = (this.label, int(this._percentage*100))
+
+        if (this._label_cache is None) or (this._label_cache[0] != key):
+            this._label_cache = (key, this.label.replace("%%",f"{key[1]}%"))
+
+        # The filled characters and the cursor are worked out when the progress bar moves (see _progress method)
+        return this._label_cache[1], this._filled, this._cursor
+
     def render(this) -> RenderableType:
         '''
         This is where the magic happen. Return RenderableType (that can be a string of an object of type Text)
@@ -114,85 +212,144 @@ class HighlightedProgressBar:
         :return: A RenderableType representing the progress bar
         '''
 
-        # The label can have a placeholder to show the percentage, which is to percentage signs %%
-        actual_text = this.label.replace("%%",f"{int(this.get_percentage*100)}%")
+        actual_text, n, cursor = this._frame()
 
-        #Text class in the Rich library comes at handy, because it easily allows me to align text
-        #and set background colours up to where I need them.
-        text = Text(text=actual_text, no_wrap=True,end="", )
+        # Only the colours of the bar need to be applied on each frame (on a copy, the cached one stays clean)
+        progress_bar = this._get_background(actual_text).copy()
 
-        #size property will indicate the whole size of the progress bar,
-        #However the label cannot be of that size because I need two characters
-        #to render something resembling a box.
+        #the first thing is that I apply the bar colour up to it's needed (the +1 is to skip the left border)
+        progress_bar.stylize(this.barStyle,1,n+1)
 
-        padding = 2
-        length = len(actual_text)
+        if cursor:
+            #I colour the next character in the progress bar with a different shade if a certain threshold is reached
+            progress_bar.stylize(this.cursorStyle,n+1,n+2)
 
-        #I check the total length of the actual label
-        #If it's less than the width
-        if length < this.width:
-            pad = this.width - length - padding
+        return progress_bar
 
-            # I make some padding if I need to center or align to the right the label
-            # Left alignment comes automatically
-            match this.alignment:
-                case "center":
-                    pad_left = int(pad/2)
-                    pad_right = pad - pad_left
+    def render_ansi(this) -> str:
+        '''
+        Same as render, but the progress bar is returned as a string with ANSI escape codes, ready to be written
+        straight to the terminal without going through the whole Rich rendering
 
-                    text.pad_left(pad_left)
-                    text.pad_right(pad_right)
-                case "right":
-                    text.pad_left(pad)
+        :return: A string representing the progress bar
+        '''
+        actual_text, n, cursor = this._frame()
 
+        bar = this._get_background(actual_text).plain
 
-        #in all the cases the text is longer than the size, then I truncate the text
-        #and replace the last character with an ellipsis ...
-        text.truncate(this.width - padding, overflow="ellipsis", pad=True)
+        color_system = COLOR_SYSTEMS.get(this.console.color_system)
 
-        #at this point, I calculate the number of characters needed to be filled with the given
-        #progress bar percentage
-        completed_characters = this.get_percentage * (this.width-padding)
+        # No colours (eg, the output is not a terminal)
+        if color_system is None:
+            return bar
 
-        #this number must be round
-        n = int(completed_characters)
-        #this extra variable calculates how much left is to fill the next character. You'll see what it does
-        next_char_perc = completed_characters - n
+        # The bar is split into border, filled part, cursor and the rest (+1 is to skip the left border)
+        parts = [(this.bgStyle, bar[0]), (this.bgStyle + this.barStyle, bar[1:n+1])]
 
-        #now I've got all I need - let's make the progress bar
+        if cursor:
+            parts.append((this.bgStyle + this.cursorStyle, bar[n+1:n+2]))
+            n += 1
 
-        #the first thing is that I apply the bar colour up to it's needed
-        text.stylize(this.barStyle,end=n)
+        parts.append((this.bgStyle, bar[n+1:]))
 
-        if (completed_characters < (this.width-padding)) and (next_char_perc>=0.5):
-            #I colour the next character in the progress bar with a different shade if a certain threshold is reached
-            text.stylize(this.cursorStyle,n,n+1)
+        return "".join(style.render(text, color_system=color_system) for style, text in parts)
+
+    def _get_background(this, actual_text:str) -> Text:
+        '''
+        Gets the unfilled progress bar for the given label.
+        The padded label (borders included) only changes when the label does, so it's built once and reused
+
+        :param actual_text: The label to show (percentage included)
+        :return: A Text object representing the empty progress bar. It must not be changed
+        '''
+        key = (actual_text, this.alignment, this.width)
+
+        if (this._background is None) or (this._background[0] != key):
+            this._background = (key, this._make_background(actual_text))
+
+        return this._background[1]
+
+    def _make_background(this, actual_text:str) -> Text:
+        '''
+        Makes the unfilled progress bar, ie the aligned label within its borders on the background colour
+
+        :param actual_text: The label to show (percentage included)
+        :return: A Text object representing the empty progress bar
+        '''
+
+        #size property will indicate the whole size of the progress bar,
+        #However the label cannot be of that size because I need two characters
+        #to render something resembling a box.
+        pad = this.width - len(actual_text) - PADDING
+
+        # I make some padding if I need to center or align to the right the label
+        # Left alignment comes automatically. So does the padding on the right (see truncate below)
+        if pad > 0:
+            if this.alignment == "center":
+                # str.center would put the odd space on the left at times, I prefer it always on the right
+                actual_text = " " * (pad // 2) + actual_text
+            elif this.alignment == "right":
+                actual_text = actual_text.rjust(this.width - PADDING)
+
+        #Text class in the Rich library comes at handy, because it easily allows me to
+        #set background colours up to where I need them.
+        text = Text(text=actual_text, no_wrap=True,end="", )
+
+        #in all the cases the text is longer than the size, then I truncate the text
+        #and replace the last character with an ellipsis ...
+        text.truncate(this.width - PADDING, overflow="ellipsis", pad=True)
 
         #let's make the whole progress bar by prefixing and affixing pipe characters |
-        progress_bar = Text(text="│")
+        progress_bar = Text(text="│", no_wrap=True, end="")
         progress_bar.append_text(text)
-        progress_bar.append_text(Text(text="│"))
+        progress_bar.append("│")
 
-        # Apply the background coloyur the whole progress bar. Don't worry, previous colours won't overwritten.
+        # Apply the background coloyur the whole progress bar. Don't worry, other colours won't overwritten.
         progress_bar.style = this.bgStyle
 
         return progress_bar
 
-    def print(this):
-        #a shortcut to print, if needed
-        this.console.print(this.render(),end="")
+    def print(this, force:bool=False):
+        '''
+        A shortcut to print, if needed. To avoid wasting time rendering frames no one can see, the progress bar
+        is not printed more than REFRESH_RATE times per second (unless it's finished or forced).
+        The cursor is brought back to the beginning of the line first, so that the progress bar is printed over itself
+
+        :param force: Print the progress bar regardless of when it was printed last time
+        :return: None
+        '''
+        now = time.monotonic()
+
+        if (not force) and (not this.finished) and ((now - this._last_print) < (1 / REFRESH_RATE)):
+            return
+
+        # At sub-character level progress, nothing changes on screen: no need to print the same thing again
+        frame = (*this._frame(), this.alignment, this.width)
+
+        if (not force) and (frame == this._last_frame):
+            return
+
+        this._last_print = now
+        this._last_frame = frame
+
+        # The bar is written as it is (carriage return included) in one go, no need for the whole Rich machinery
+        this.console.file.write("\r" + this.render_ansi())
+        this.console.file.flush()
 
 if __name__ == "__main__":
-    import time
     pb = HighlightedProgressBar(100,50)
     pb.alignment="center"
 
     pb.console.show_cursor(False)
 
+    # ticks are paced on the monotonic clock, so that the time spent printing doesn't add up to the waiting
+    next_tick = time.monotonic()
+
     for i in range(0,pb.total):
         pb.advance(1,"Computerphile [%%]")
         pb.print()
-        print("\r",end="")
-        time.sleep(1)
+
+        next_tick += 1
+        time.sleep(max(0, next_tick - time.monotonic()))
 
     pb.console.show_cursor(True)
@@ -18,32 +18,37 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+from __future__ import annotations
+
 import json
 import asyncio
 from sys import stderr
 from argparse import Namespace, ArgumentParser, ArgumentTypeError
-from rich.panel import Panel
-from rich.console import Console
-from rich.table import Table
-from tui import RobinHood
 from enums import SyncMode
 from config import RobinHoodProfile, RobinHoodConfiguration, get_config_file
-from typing import Union, Callable, Any
-from pyrclone.pyrclone import rclone
-
+from typing import Union, Any, List
+from dataclasses import dataclass
 
-def run_in_asyncio(func:Callable)->Callable:
+# Heavy modules (Textual, Rich, rclone) are imported only by the commands using them,
+# so that short commands (eg, --help or profile --list) don't pay for loading the whole TUI
 
-    def runner(*args,**kwargs):
-        asyncio.run(func(*args,**kwargs))
 
-    return runner
-@run_in_asyncio
-async def rclone_remotes(args:Namespace) -> None:
+def rclone_remotes(args:Namespace) -> None:
     '''
     Print on screen the list of remote directories configured on rclone
     '''
 
+    asyncio.run(_print_rclone_remotes())
+
+
+async def _print_rclone_remotes() -> None:
+    '''
+    Asynchronous part of rclone_remotes (rclone is managed asynchronously)
+    '''
+    from rich.console import Console
+    from rich.table import Table
+    from pyrclone.pyrclone import rclone
+
     # create a new console interface (rich)
     console = Console()
 
@@ -63,6 +68,51 @@ async def rclone_remotes(args:Namespace) -> None:
     console.print(table)
 
 
+@dataclass(slots=True)
+class _ArgOverrides:
+    '''
+    Profile settings overridden over the command line. Each field is named after the profile attribute it overrides,
+    and it's None when the user hasn't specified it
+    '''
+    source_path: Union[str | None] = None
+    destination_path: Union[str | None] = None
+    exclusion_filters: Union[List[str] | None] = None
+    on_completion: Union[str | None] = None
+    exclude_hidden_files: Union[bool | None] = None
+    deep_comparisons: Union[bool | None] = None
+
+    @classmethod
+    def from_args(cls, args: Namespace) -> _ArgOverrides:
+        '''
+        Picks the overrides from the command line arguments.
+        In some cases (e.g., dedupe command), an argument may not even exist in the args Namespace
+
+        :param args: Command-line arguments
+        :return: An object of type _ArgOverrides
+        '''
+        return cls(
+            source_path=getattr(args, "local", None),
+            destination_path=getattr(args, "remote", None),
+            exclusion_filters=getattr(args, "exclude", None),
+            on_completion=getattr(args, "on_completion", None),
+            # Binary flags can only switch on an option (they are False when not specified)
+            exclude_hidden_files=True if getattr(args, "exclude_hidden", False) else None,
+            deep_comparisons=True if getattr(args, "deep", False) else None,
+        )
+
+    def apply(this, profile: RobinHoodProfile) -> None:
+        '''
+        Overrides the settings of a profile with those specified by the user
+
+        :param profile: The profile to change
+        '''
+        for field in this.__slots__:
+            value = getattr(this, field)
+
+            if value is not None:
+                setattr(profile, field, value)
+
+
 def make_configuration(args: Namespace) -> RobinHoodProfile:
     '''
     This function returns a suitable user profile (which can be new or loaded as specified by the user).
@@ -97,31 +147,7 @@ def make_configuration(args: Namespace) -> RobinHoodProfile:
     profile = cfg.current_profile
 
     # At this point, the user can overwrite the profile over the command line
-    # Let's check if the local directory path needs to be overridden
-    if args.local is not None:
-        profile.source_path = args.local
-
-    # Let's check if the remote directory path needs to be overridden
-    # In some cases (e.g., dedupe command), a remote argument may not even exist.
-    # For this reason, it's required to check if `remote` is part of the args Namespace
-    if (hasattr(args, "remote") and (args.remote is not None)):
-        profile.destination_path = args.remote
-
-
-    # Let's check if the user wants to exclude hidden files
-    if (args.exclude_hidden):
-        profile.exclude_hidden_files = args.exclude_hidden
-
-    # Let's check if the user wants to perform deep comparison
-    if args.deep:
-        profile.deep_comparisons = args.deep
-
-    # Let's check if the user wants to override the exclusion filters
-    if args.exclude is not None:
-        profile.exclusion_filters = args.exclude
-
-    if (args.on_completion is not None):
-        profile.on_completion = args.on_completion
+    _ArgOverrides.from_args(args).apply(profile)
 
     if args.clear_cache:
         profile.clear_cache()
@@ -197,6 +223,9 @@ def action_profiles(args: Namespace) -> None:
     #Let's check what the user wants to do
     #Do they want to list all the profiles?
     if args.list:
+        from rich.console import Console, Group
+        from rich.panel import Panel
+
         # Make a new console interface
         console = Console()
 
@@ -209,9 +238,8 @@ def action_profiles(args: Namespace) -> None:
             print("No profiles found.",file=stderr)
             exit(1)
         else:
-            # If there are profiles, a loop will print them all in the console
-            for name, profile in profiles.items():
-                console.print(Panel(str(profile), title=name))
+            # If there are profiles, they are all printed in the console in one go
+            console.print(Group(*(Panel(str(profile), title=name) for name, profile in profiles.items())))
     # Do they want to create a new profile?
     elif args.create is not None:
         # Get the name from the command line
@@ -284,6 +312,7 @@ def open_tui(profile: Union[RobinHoodProfile | None] = None) -> None:
     Opens the Textual User Interface (Interactive)
     :param profile: A RobinHoodProfile with pre-filled configuration (or None)
     '''
+    from tui import RobinHood
 
     app = RobinHood(profile)
     app.run()
@@ -2,15 +2,28 @@ from __future__ import annotations
 
 import asyncio
 from abc import ABC, abstractmethod
-from typing import List,  Union, Callable,  Iterable, AsyncIterable
+from itertools import islice
+from typing import List,  Union, Callable,  Iterable, Dict, Tuple
 from filesystem import AbstractPath
 from filesystem import  FileSystemObject, FileSystem, FileType
 from enums import ActionDirection, SyncStatus, ActionType
 from events import SyncEvent, RobinHoodBackend
-from bigtree import Node, add_dict_to_tree_by_path, preorder_iter, postorder_iter, find_path
+from bigtree import Node, add_dict_to_tree_by_path, preorder_iter
 from pyrclone.pyrclone import rclone, RCJobStatus
 from aiohttp import ClientOSError, ClientResponseError
 
+# Seconds between two checks of the status of the transfers. It starts from the minimum and, as long as nothing
+# changes, it doubles up to the maximum (eg, large files being transferred)
+MIN_POLL_INTERVAL = 0.05
+POLL_INTERVAL = 0.5
+
+# Status of an action given the status of its rclone job
+RC_TO_SYNC_STATUS = {
+    RCJobStatus.NOT_STARTED: SyncStatus.NOT_STARTED,
+    RCJobStatus.IN_PROGRESS: SyncStatus.IN_PROGRESS,
+    RCJobStatus.FINISHED: SyncStatus.SUCCESS,
+    RCJobStatus.FAILED: SyncStatus.FAILED,
+}
 
 
 def _get_trigger_fn(eventhandler: Union[SyncEvent | None] = None) -> Callable[[str, SyncEvent], None]:
@@ -26,11 +39,50 @@ def _get_trigger_fn(eventhandler: Union[SyncEvent | None] = None) -> Callable[[s
 
 
 
+async def get_jobs_status(rclone_engine:rclone) -> Dict[int, RCJobStatus]:
+    '''
+    Gets the status of all the jobs in rclone
+    :param rclone_engine: An rclone object
+    :return: A dictionary with the status of each job by its ID
+    '''
+    try:
+        return {id: status async for id, status in rclone_engine.jobs}
+    except ClientOSError: #This exception appears when sometimes I stop the jobs. Not sure what's wrong with rclone
+        return {}
+
+
+# What descendants do when they don't agree on a single action type and direction (see _merge_descendants)
+MIXED_ACTIONS = object()
+
+
+def _merge_descendants(x:Union[Tuple[ActionType, ActionDirection] | object | None],
+                       y:Union[Tuple[ActionType, ActionDirection] | object | None]) \
+        -> Union[Tuple[ActionType, ActionDirection] | object | None]:
+    '''
+    Puts together what two groups of actions do. What a group does is either None (nothing, eg all excluded), a tuple
+    (type, direction) if all of them agree, or MIXED_ACTIONS if they don't
+
+    :param x: What the first group does
+    :param y: What the second group does
+    :return: What both groups do
+    '''
+    if x is None:
+        return y
+
+    if (y is None) or (x == y):
+        return x
+
+    return MIXED_ACTIONS
+
+
 class SyncDirectionNotPermittedException(Exception):
     ...
 
 class AbstractSyncAction(ABC):
 
+    # There is an action for each file being compared, so no __dict__ for them (as for file system objects)
+    __slots__ = ('a', 'b', '_type', '_direction', '_update', 'excluded', '_status', '_tree_key')
+
     def __init__(this,
                  a: FileSystemObject,
                  b: FileSystemObject,
@@ -44,6 +96,8 @@ class AbstractSyncAction(ABC):
         this._update = None
         this.excluded=False
         this._status = SyncStatus.NOT_STARTED
+        # (direction, path) - see tree_key
+        this._tree_key:Union[tuple | None] = None
 
         this._validate_action_direction()
 
@@ -64,6 +118,18 @@ class AbstractSyncAction(ABC):
     def update(this) -> Union[RCJobStatus | None]:
         return this.get_update()
 
+    @property
+    def tree_key(this) -> str:
+        '''
+        Gets the path of this action in the tree of changes (see SynchManager). It's worked out again only if the
+        direction of the action changes
+        '''
+        if (this._tree_key is None) or (this._tree_key[0] != this._direction):
+            fso = this.b if this._direction == ActionDirection.DST2SRC else this.a
+            this._tree_key = (this._direction, f"./{fso.relative_path}")
+
+        return this._tree_key[1]
+
     @property
     def is_folder(this) -> bool:
         return (this.a.type == FileType.DIR) or (this.b.type == FileType.DIR)
@@ -77,7 +143,12 @@ class AbstractSyncAction(ABC):
         ...
 
     @abstractmethod
-    async def update_status(this, rclone_engine:rclone) -> SyncStatus:
+    async def update_status(this, rclone_engine:rclone, jobs:Union[Dict[int, RCJobStatus] | None] = None) -> SyncStatus:
+        '''
+        Updates the status of the action
+        :param rclone_engine: An rclone object
+        :param jobs: The status of all the rclone jobs by their ID, if already known (see get_jobs_status)
+        '''
         ...
 
 
@@ -121,6 +192,18 @@ class AbstractSyncAction(ABC):
     def get_update(this) -> Union[RCJobStatus | None]:
         return this._update
 
+    def cache_changes(this, source:FileSystem, destination:FileSystem) \
+            -> List[Tuple[FileSystem, FileSystemObject, Union[FileSystemObject | None]]]:
+        '''
+        Tells what changes in the file system caches once this action is successfully applied (see
+        SynchManager.flush_action). Only regular files are kept in the caches
+
+        :param source: Source file system
+        :param destination: Destination file system
+        :return: A list of (file system, changed object, new object or None if it's been removed)
+        '''
+        return []
+
 
     def retry(this):
         """
@@ -144,6 +227,7 @@ class AbstractSyncAction(ABC):
 
 
 class NoSyncAction(AbstractSyncAction):
+    __slots__ = ()
 
     def __init__(this, a: FileSystemObject, b: FileSystemObject):
         super().__init__(a, b, type=ActionType.NOTHING)
@@ -153,7 +237,7 @@ class NoSyncAction(AbstractSyncAction):
 
     async def apply_action(this, rclone_engine: rclone) -> None:
         ...
-    async def update_status(this, rclone_engine:rclone) -> None:
+    async def update_status(this, rclone_engine:rclone, jobs:Union[Dict[int, RCJobStatus] | None] = None) -> None:
         this._status = SyncStatus.SUCCESS
 
     def swap_direction(this) -> None:
@@ -167,6 +251,8 @@ class NoSyncAction(AbstractSyncAction):
 
 
 class CopySyncAction(AbstractSyncAction):
+    __slots__ = ('_jobid',)
+
     def __init__(this, a: FileSystemObject, b: FileSystemObject, direction=ActionDirection.SRC2DST):
         type = ActionType.UPDATE if (a.exists and b.exists) else ActionType.COPY
 
@@ -185,6 +271,16 @@ class CopySyncAction(AbstractSyncAction):
         super().retry()
         this._jobid = None
 
+    def cache_changes(this, source:FileSystem, destination:FileSystem) \
+            -> List[Tuple[FileSystem, FileSystemObject, Union[FileSystemObject | None]]]:
+        # the copied file is now on the other side as well
+        if this.direction == ActionDirection.SRC2DST:
+            side, fso = destination, this.a
+        else:
+            side, fso = source, this.b
+
+        return [(side, fso, fso)] if fso.type == FileType.REGULAR else []
+
     async def apply_action(this, rclone_engine: rclone) -> None:
         if this.excluded:
             return
@@ -205,25 +301,17 @@ class CopySyncAction(AbstractSyncAction):
         if not this.is_folder:
             this._jobid = await rclone_engine.copy_file(src_root, src_path, dst_root, dst_path)
 
-    async def update_status(this, rclone_engine:rclone) -> None:
+    async def update_status(this, rclone_engine:rclone, jobs:Union[Dict[int, RCJobStatus] | None] = None) -> None:
 
         if this._jobid is not None:
-            try:
-                async for id,status in rclone_engine.jobs:
-                    if id == this._jobid:
-                        match status:
-                            case RCJobStatus.NOT_STARTED:
-                                this._status = SyncStatus.NOT_STARTED
-                            case RCJobStatus.IN_PROGRESS:
-                                this._status = SyncStatus.IN_PROGRESS
-                            case RCJobStatus.FINISHED:
-                                this._status = SyncStatus.SUCCESS
-                            case RCJobStatus.FAILED:
-                                this._status = SyncStatus.FAILED
-
-                        this._update = rclone_engine.get_last_status_update(this._jobid)
-            except ClientOSError: #This exception appears when sometimes I stop the jobs. Not sure what's wrong with rclone
-                ...
+            if jobs is None:
+                jobs = await get_jobs_status(rclone_engine)
+
+            status = jobs.get(this._jobid)
+
+            if status is not None:
+                this._status = RC_TO_SYNC_STATUS.get(status, this._status)
+                this._update = rclone_engine.get_last_status_update(this._jobid)
 
 
         else:
@@ -233,6 +321,8 @@ class CopySyncAction(AbstractSyncAction):
 
 
 class DeleteSyncAction(AbstractSyncAction):
+    __slots__ = ()
+
     def __init__(this,
                  a: FileSystemObject,
                  b: FileSystemObject,
@@ -243,6 +333,20 @@ class DeleteSyncAction(AbstractSyncAction):
     def _repr_type(this) -> str:
         return "x"
 
+    def cache_changes(this, source:FileSystem, destination:FileSystem) \
+            -> List[Tuple[FileSystem, FileSystemObject, Union[FileSystemObject | None]]]:
+        changes = []
+
+        if (this.direction == ActionDirection.SRC2DST) or (this.direction == ActionDirection.BOTH):
+            if this.b.type == FileType.REGULAR:
+                changes.append((destination, this.b, None))
+
+        if (this.direction == ActionDirection.DST2SRC) or (this.direction == ActionDirection.BOTH):
+            if this.a.type == FileType.REGULAR:
+                changes.append((source, this.a, None))
+
+        return changes
+
     def _validate_action_direction(this):
         if this is not None:
             x = this.a.exists
@@ -278,19 +382,21 @@ class DeleteSyncAction(AbstractSyncAction):
             if "directory not empty" in e.message:
                 ... #needs to be addressed somehow, for the time being I'll suppose it's a fail
 
-    async def update_status(this, rclone_engine:rclone) -> None:
+    async def update_status(this, rclone_engine:rclone, jobs:Union[Dict[int, RCJobStatus] | None] = None) -> None:
 
         if this.status == SyncStatus.IN_PROGRESS:
-            src_side = True
-            dst_side = True
+            # files that should be gone (both sides are checked at the same time)
+            to_check = []
 
             if (this.direction == ActionDirection.SRC2DST) or (this.direction == ActionDirection.BOTH):
-                dst_side = not (await rclone_engine.exists(this.b.fullpath.root, this.b.fullpath.relative_path))
+                to_check.append(this.b.fullpath)
 
             if (this.direction == ActionDirection.DST2SRC) or (this.direction == ActionDirection.BOTH):
-                src_side = not (await rclone_engine.exists(this.a.fullpath.root, this.a.fullpath.relative_path))
+                to_check.append(this.a.fullpath)
+
+            exist = await asyncio.gather(*[rclone_engine.exists(p.root, p.relative_path) for p in to_check])
 
-            this._status = SyncStatus.SUCCESS if src_side and dst_side else SyncStatus.FAILED
+            this._status = SyncStatus.FAILED if any(exist) else SyncStatus.SUCCESS
 
 
     def swap_direction(this) -> None:
@@ -320,47 +426,122 @@ class SynchManager:
 
         this._changes = Node(name=".")
 
+        # Actions not yet in the tree (see add_action)
+        this._pending_actions:Dict[str, Dict] = {}
+
+        # Nodes of the tree by their path (see _find_node)
+        this._path_index:Union[Dict[str, Node] | None] = None
+
         this._rclone_manager:Union[rclone|None] = None
 
     def __iter__(this) -> Iterable[AbstractSyncAction]:
-        for node in preorder_iter(this._changes):
-            if (action := node.get_attr('action')) is not None:
-                yield action
+        # nodes are indexed in preorder, so there's no need to go through the tree again
+        for node in this._get_path_index().values():
+            yield node.get_attr('action')
 
     def __len__(this) -> int:
         return this._length
 
 
-    @property
-    async def changes(this) -> AsyncIterable[AbstractSyncAction]:
-        for action in this:
-            yield action
-
-    def add_action(this, action: AbstractSyncAction) -> int:
-        src_path = this.source.root
-        dst_path = this.destination.root
+    def add_action(this, action: AbstractSyncAction, *, validate:bool=True) -> int:
+        """
+        Adds an action. Adding actions to the tree one by one means going through bigtree each time, so they are kept
+        aside and added all together the first time the tree is needed (see _add_pending_actions)
 
-        # Check if the paths in the provided action are rooted properly in both source and dest directories
-        if not AbstractPath.is_root_of(action.a.absolute_path,
-                                       src_path):  # this._root_source.is_under_root(action.a.absolute_path):
-            raise ValueError(f"The file '{action.a.relative_path} 'is not in '{src_path}'")
+        :param action: The action to add
+        :param validate: Check that the files of the action are in the source and destination directories. It can be
+                         skipped only when the files come from walking such directories (eg, see compare_tree)
+        :return: The ID given to the action
+        """
+        if validate:
+            src_path = this.source.root
+            dst_path = this.destination.root
 
-        if not AbstractPath.is_root_of(action.b.absolute_path,
-                                       dst_path):  # this._root_destination.is_under_root(action.b.absolute_path):
-            raise ValueError(f"The file '{action.b.relative_path} 'is not in '{dst_path}'")
+            # Check if the paths in the provided action are rooted properly in both source and dest directories
+            if not AbstractPath.is_root_of(action.a.absolute_path,
+                                           src_path):  # this._root_source.is_under_root(action.a.absolute_path):
+                raise ValueError(f"The file '{action.a.relative_path} 'is not in '{src_path}'")
 
-        path = f"./{action.b.relative_path if action.direction == ActionDirection.DST2SRC else action.a.relative_path}"
+            if not AbstractPath.is_root_of(action.b.absolute_path,
+                                           dst_path):  # this._root_destination.is_under_root(action.b.absolute_path):
+                raise ValueError(f"The file '{action.b.relative_path} 'is not in '{dst_path}'")
 
         idx = this._idx
 
-        new_node = {path:{'action':action, 'id': idx}}
+        this._pending_actions[action.tree_key] = {'action':action, 'id': idx}
+
+        # the index needs to be made again to include the new node
+        this._path_index = None
 
-        this._changes = add_dict_to_tree_by_path(this._changes,new_node)
         this._idx+=1
         this._length += 1
 
         return idx
 
+    def add_actions(this, actions: Iterable[AbstractSyncAction], *, validate:bool=True) -> List[int]:
+        """
+        Adds several actions at once
+
+        :param actions: The actions to add
+        :param validate: Check that the files of the actions are in the source and destination directories (see add_action)
+        :return: A list with the IDs given to each action (same order as the provided actions)
+        """
+        return [this.add_action(action, validate=validate) for action in actions]
+
+    def _add_pending_actions(this) -> None:
+        """
+        Adds to the tree all the actions kept aside by add_action, in one go
+        """
+        if len(this._pending_actions) > 0:
+            this._changes = add_dict_to_tree_by_path(this._changes,this._pending_actions)
+            this._pending_actions = {}
+
+    def _find_node(this, path:str) -> Union[Node | None]:
+        """
+        Finds the node in the tree of changes with the provided path.
+        Finding a node with bigtree means searching the whole tree each time, so all the nodes are indexed by their
+        path instead (see _get_path_index)
+
+        :param path: The path of the node (as used when the action was added)
+        :return: The node with such a path, None if it doesn't exist
+        """
+        return this._get_path_index().get(path)
+
+    def _resolve(this, action:[AbstractSyncAction | Node]) -> Tuple[Node, AbstractSyncAction]:
+        """
+        Gets the node of the tree of changes and its action, whichever of the two is provided
+
+        :param action: An action (its node is looked up by path, see _find_node) or a node
+        :return: A tuple with the node and the action (the provided one, if an action is given)
+        """
+        if isinstance(action, AbstractSyncAction):
+            return this._find_node(action.tree_key), action
+
+        if isinstance(action, Node):
+            return action, action.get_attr("action")
+
+        raise TypeError("The provided action type is not supported")
+
+    def _get_path_index(this) -> Dict[str, Node]:
+        """
+        Gets all the nodes with an action, indexed by their path (in preorder).
+        The index is made (in one go) the first time it's needed after actions have been added
+
+        :return: A dictionary with the nodes by their path
+        """
+        if this._path_index is None:
+            this._add_pending_actions()
+
+            index = {}
+
+            for node in preorder_iter(this._changes):
+                if (action := node.get_attr("action")) is not None:
+                    index[action.tree_key] = node
+
+            this._path_index = index
+
+        return this._path_index
+
     def cancel_action(this, action: AbstractSyncAction, in_place: bool = False) -> AbstractSyncAction:
         """
         Converts any action with a NoSyncAction
@@ -407,20 +588,30 @@ class SynchManager:
         :param replace_with: New action
         """
 
-        #get the path to be found within the tree
-        path = action.b.relative_path if action.direction == ActionDirection.DST2SRC else action.a.relative_path
-        path = f"./{path}"
+        this.replace_all([(action, replace_with)])
+
+    def replace_all(this, replacements: Iterable[Tuple[AbstractSyncAction, AbstractSyncAction]]) -> None:
+        """
+        Same as replace, but for several actions at once (eg, all the actions selected by the user).
+        Parent directories shared by the replaced actions are made consistent only once, at the end
+
+        :param replacements: Pairs of actions, ie the action to be replaced and the new one
+        """
+        nodes = []
+
+        for action, replace_with in replacements:
+            #find the corresponding node in the tree
+            node = this._find_node(action.tree_key)
 
-        #find the corresponding node in the tree
-        node = find_path(this._changes, path)
+            #replace the action
+            node.action = replace_with
 
-        #replace the action
-        node.action = replace_with
+            #make sure that the tree of changes is consistent with the new change
+            this.make_children_as_parent(node)
 
-        #make sure that the tree of changes is consistent with the new change
-        this.make_children_as_parent(node)
+            nodes.append(node)
 
-        this.make_subtree_consistent(replace_with, True)
+        this.make_subtrees_consistent(nodes, True)
 
     async def abort(this):
         assert this._rclone_manager is not None, "No jobs started"
@@ -429,8 +620,11 @@ class SynchManager:
 
 
 
-        async for x in this.changes:
-            await x.update_status(this._rclone_manager)
+        # all the jobs are listed once, rather than once per action
+        jobs = await get_jobs_status(this._rclone_manager)
+
+        for x in this:
+            await x.update_status(this._rclone_manager, jobs)
 
 
     async def apply_changes(this, rclone_manager: rclone, eventhandler: [SyncEvent | None] = None) -> None:
@@ -447,29 +641,54 @@ class SynchManager:
 
         this._rclone_manager = rclone_manager # I set this internally to be used by abort (or other methods)
 
-        # clean previous stopped jobs if any
-        async for gr in rclone_manager.get_group_list():
-            await rclone_manager.delete_group_stats(gr)
+        # clean previous stopped jobs if any (all at once, they don't depend on each other)
+        groups = [gr async for gr in rclone_manager.get_group_list()]
+        await asyncio.gather(*[rclone_manager.delete_group_stats(gr) for gr in groups])
 
-        async for x in this.changes:
+        for x in this:
             x.retry() # if there were failed transfers/actions, it'll reset their status to be attempted a new transfer
             manager.append(x) #append the action to the transfer manager
 
         manager.rearrange_actions()
 
+        # how long to wait before the next check and how many actions there were per status at the last one
+        interval = MIN_POLL_INTERVAL
+        last_counts = None
+
         # the manager will transfer files at batches (E.g., 4) and the while loop checks if there are still pending actions
-        while not (await manager.has_finished()):
+        while True:
+            # rclone is asked about the status of the actions once per round, all the checks below rely on that
+            try:
+                await manager.refresh_status()
+            except Exception as e:
+                # if the status can't be known, there is not much else to do
+                print(e)
+                break
+
+            if manager.has_finished():
+                break
+
             # submit new jobs if I am below the quota
             await manager.attempt_job_submission()
 
             #checking which actions are still active
-            active_actions = [x async for x in manager.actions]
+            active_actions = list(manager.actions)
             if len(active_actions) > 0:
                 # if any, I will signal the event handler
                 _trigger("on_synching", SyncEvent(active_actions))
 
+            # rclone does the transfers on its own, there's no point in asking how they are doing too often
+            # (without waiting, this loop would keep the CPU busy when no more jobs can be submitted).
+            # If some action has moved on since the last check, others will likely do soon: rclone is asked again
+            # shortly. Otherwise, it's asked less and less often
+            counts = manager.status_counts()
+            interval = MIN_POLL_INTERVAL if counts != last_counts else min(interval * 2, POLL_INTERVAL)
+            last_counts = counts
+
+            await asyncio.sleep(interval)
+
         #when all it's done, I make the change effective inside the action
-        async for a in manager.actions_finished:
+        for a in manager.actions_finished:
             this.flush_action(a)
 
         #local cache is also flushed
@@ -498,26 +717,8 @@ class SynchManager:
         if action.status != SyncStatus.SUCCESS:
             return
 
-        match action.type:
-            case ActionType.COPY | ActionType.UPDATE:
-                side = this.destination if action.direction == ActionDirection.SRC2DST else this.source
-                fso = action.a if action.direction == ActionDirection.SRC2DST else action.b
-
-                if fso.type == FileType.REGULAR:
-                    side.set_file(fso.fullpath, fso)
-            case ActionType.DELETE:
-                if (action.direction == ActionDirection.SRC2DST) or (action.direction == ActionDirection.BOTH):
-                    fso = action.b
-                    if fso.type == FileType.REGULAR:
-                        this.destination.set_file(fso.fullpath, None)
-
-                if (action.direction == ActionDirection.DST2SRC) or (action.direction == ActionDirection.BOTH):
-                    fso = action.a
-                    if fso.type == FileType.REGULAR:
-                        this.source.set_file(fso.fullpath, None)
-
-
-
+        for side, fso, new_fso in action.cache_changes(this.source, this.destination):
+            side.set_file(fso.fullpath, new_fso)
 
     def make_children_as_parent(this, action: [AbstractSyncAction | Node]) -> None:
         """
@@ -527,16 +728,7 @@ class SynchManager:
         """
 
         # Check the input to determine the correct node in the tree
-        if isinstance(action, AbstractSyncAction):
-            path = action.b.relative_path if action.direction == ActionDirection.DST2SRC else action.a.relative_path
-            path = f"./{path}"
-
-            node = find_path(this._changes, path)
-        elif isinstance(action, Node):
-            node = action
-            action = node.get_attr("action")
-        else:
-            raise TypeError("The provided action type is not supported")
+        node, action = this._resolve(action)
 
         # get type and direction of the current action
         type = action.type
@@ -550,7 +742,8 @@ class SynchManager:
                 a = SynchManager.make_action(a.a,a.b,type,dir)
                 x.set_attrs({"action":a})
 
-    def make_action_consistent(this,action:[AbstractSyncAction|Node], force_no_action:bool=True) -> None:
+    def make_action_consistent(this,action:[AbstractSyncAction|Node], force_no_action:bool=True,
+                               _descendants_cache:Union[Dict[int, List[Node]] | None]=None) -> None:
         """
         This method is useful to propagate changes in an action when (at least) one of the descendant has changed
         If all the descendant would have the same action/direction, then the parent node (provided) will be changed as
@@ -559,55 +752,64 @@ class SynchManager:
 
         :param action: the parent node to check
         :param force_no_action: Change the action of the parent to no_action no matter what's below it
+        :param _descendants_cache: The descendants of the nodes already checked (see make_subtrees_consistent)
         """
 
         # retrieve the right node from the tree
-        if isinstance(action, AbstractSyncAction):
-            path = action.b.relative_path if action.direction == ActionDirection.DST2SRC else action.a.relative_path
-            path = f"./{path}"
+        node, action = this._resolve(action)
 
-            node = find_path(this._changes, path)
-        elif isinstance(action,Node):
-            node = action
-            action = node.get_attr("action")
-        else:
-            raise TypeError("The provided action type is not supported")
+        #whether there are descendants and what they do (see _merge_descendants)
+        has_descendants = False
+        descendants = None
+
+        descendants_iter = node.descendants
 
-        #list of action types, directions, and whether they are excluded
-        type = []
-        dir  = []
-        excluded = []
+        if _descendants_cache is not None:
+            descendants_iter = this._get_descendants(node, _descendants_cache)
 
-        #retrieve the above information from all descendants
-        for n in node.descendants:
+        #retrieve the above information from all descendants (no need to go any further at the first mismatch)
+        for n in descendants_iter:
             a = n.get_attr("action")
-            excluded.append(a.excluded)
+            has_descendants = True
 
             if not a.excluded:
-                type.append(a.type)
-                dir.append(a.direction)
+                descendants = _merge_descendants(descendants, (a.type, a.direction))
+
+                if descendants is MIXED_ACTIONS:
+                    break
+
+        this._set_consistent_action(node, action, has_descendants, descendants, force_no_action)
+
+    def _set_consistent_action(this, node:Node, action:AbstractSyncAction, has_descendants:bool,
+                               descendants:Union[Tuple[ActionType, ActionDirection] | object | None],
+                               force_no_action:bool) -> None:
+        """
+        Changes the action of a node according to what its descendants do (see make_action_consistent)
+
+        :param node: the parent node
+        :param action: the action of the parent node
+        :param has_descendants: whether the node has descendants
+        :param descendants: what the descendants (not excluded) do (see _merge_descendants)
+        :param force_no_action: Change the action of the parent to no_action no matter what's below it
+        """
 
         #if the descendants are all excluded, then the parent node will be excluded too
-        if (len(excluded)>0) and (all(excluded)):
+        if has_descendants and (descendants is None):
             new_action = SynchManager.make_action(action.a, action.b, ActionType.NOTHING, ActionDirection.SRC2DST)
             new_action.excluded = True
         else:
             # if it has not descendant, then return
-            if (len(type) == 0) or (len(dir) == 0):
+            if descendants is None:
                 return
 
-            set_type = set(type)
-            set_dir = set(dir)
-
             # setting default action/direction to Nothing/>
             new_type = ActionType.NOTHING
             new_dir  = ActionDirection.SRC2DST
 
             # if all descendants have one direction in the same action
-            if (len(set_type)==1) and (len(set_dir)==1):
+            if descendants is not MIXED_ACTIONS:
                 # if so, the current action will be as the descendants
-                new_type = set_type.pop()
-                new_dir = set_dir.pop()
+                new_type, new_dir = descendants
             #in this case, descendats have mismatched actions and direction, will do something if forced
             elif not force_no_action:
                 return
@@ -618,31 +820,87 @@ class SynchManager:
         node.set_attrs({"action": new_action })
 
     def make_subtree_consistent (this,action:[AbstractSyncAction|Node], force_no_action:bool=True) -> None:
+        node, _ = this._resolve(action)
 
-        if isinstance(action, AbstractSyncAction):
-            path = action.b.relative_path if action.direction == ActionDirection.DST2SRC else action.a.relative_path
-            path = f"./{path}"
+        this.make_subtrees_consistent([node], force_no_action)
 
-            node = find_path(this._changes, path)
-        elif isinstance(action,Node):
-            node = action
-        else:
-            raise TypeError("The provided action type is not supported")
+    def make_subtrees_consistent(this, nodes:Iterable[Node], force_no_action:bool=True) -> None:
+        """
+        Makes the provided nodes and all their parents consistent (see make_action_consistent).
+        Each node is checked once, even if it's the parent of several of the provided nodes
+
+        :param nodes: The nodes that have changed
+        :param force_no_action: Change the action of the parents to no_action no matter what's below them
+        """
+        to_check = {}
+
+        for node in nodes:
+            to_check[id(node)] = node
+
+            while (node:=node.parent) is not None:
+                # if a parent is there already, so are its parents
+                if id(node) in to_check:
+                    break
+
+                if node.get_attr("action") is not None:
+                    to_check[id(node)] = node
+
+        # The tree doesn't change shape here, so the descendants of a node are reused by its parents
+        descendants_cache = {}
 
+        # Deepest nodes first, as each node depends on its descendants
+        for n in sorted(to_check.values(), key=lambda n: n.depth, reverse=True):
+            this.make_action_consistent(n, force_no_action, _descendants_cache=descendants_cache)
+
+    @staticmethod
+    def _get_descendants(node:Node, cache:Dict[int, List[Node]]) -> List[Node]:
+        """
+        Gets all the descendants of a node. The descendants of its children are taken from the cache when there,
+        so that the same subtree is not walked through again
+
+        :param node: The node whose descendants are needed
+        :param cache: The descendants of other nodes by their id (it'll be updated with the ones of this node)
+        :return: A list with the descendants of the node
+        """
+        if (descendants := cache.get(id(node))) is None:
+            descendants = []
 
-        parents = [node]
+            for child in node.children:
+                descendants.append(child)
 
-        while (node:=node.parent) is not None:
-            if node.get_attr("action") is not None:
-                parents.append(node)
+                if (child_descendants := cache.get(id(child))) is not None:
+                    descendants.extend(child_descendants)
+                else:
+                    descendants.extend(child.descendants)
 
-        for n in parents:
-            this.make_action_consistent(n, force_no_action)
+            cache[id(node)] = descendants
+
+        return descendants
 
     async def make_all_actions_consistend(this):
-        for node in postorder_iter(this._changes):
-            if node.get_attr("action") is not None:
-                this.make_action_consistent(node, True)
+        # What the descendants of each node do (see _merge_descendants). Each node only needs to look at its children
+        # (and what their descendants do) rather than going through all its descendants
+        summaries = {}
+
+        # in reversed preorder, all the descendants of a node come before it (as in postorder)
+        for i, node in enumerate(reversed(this._get_path_index().values())):
+            has_descendants = False
+            descendants = None
+
+            for child in node.children:
+                a = child.get_attr("action")
+                has_descendants = True
+
+                if not a.excluded:
+                    descendants = _merge_descendants(descendants, (a.type, a.direction))
+
+                descendants = _merge_descendants(descendants, summaries.pop(id(child), None))
+
+            this._set_consistent_action(node, node.get_attr("action"), has_descendants, descendants, True)
+            summaries[id(node)] = descendants
+
+            # every now and then, other tasks (eg, the UI) get the chance to run
+            if (i % 1024) == 0:
                 await asyncio.sleep(0)
 
     @classmethod
@@ -672,8 +930,11 @@ class TransferManager:
 
     def __init__(this, rclone:rclone, max_transfers:int = 4):
         this._max_transfers = max_transfers
-        this._actions:List[AbstractSyncAction] = []
+        # actions by their id, so that they can be removed without looking for them (dictionaries keep the order)
+        this._actions:Dict[int, AbstractSyncAction] = {}
         this._rclone = rclone
+        # actions by their status, as of the last time it was asked to rclone (see refresh_status)
+        this._by_status:Union[Dict[SyncStatus, List[AbstractSyncAction]] | None] = None
 
     @property
     def max_transfers(this) -> int:
@@ -683,99 +944,114 @@ class TransferManager:
     def max_transfers(this, value:int) -> None:
         this._max_transfers = value
 
-    async def filter_by_status(this, status:SyncStatus):
-        async for action in this.actions:
-            if action.status == status:
-                yield action
+    async def refresh_status(this) -> None:
+        """
+        Asks rclone about the status of all the actions. This is done once per round (see SynchManager.apply_changes),
+        all the other methods use the status got from here
+        """
+        # all the jobs are listed once, rather than once per action
+        jobs = await get_jobs_status(this._rclone)
 
-    @property
-    async def actions(this) -> AsyncIterable:
-        for action in this._actions:
-            await action.update_status(this._rclone)
-            yield action
+        # once an action is done (whatever the outcome), its status doesn't change anymore.
+        # Some actions still need to ask rclone on their own (eg, deletions): they all do that at the same time
+        await asyncio.gather(*[action.update_status(this._rclone, jobs) for action in this._actions.values()
+                               if action.status not in (SyncStatus.SUCCESS, SyncStatus.FAILED)])
 
+        # while at it, actions are grouped by their status, so that nothing else needs to go through all of them
+        by_status = {}
 
-    @property
-    async def queued_actions(this) -> AsyncIterable[AbstractSyncAction]:
-        async for action in this.filter_by_status(SyncStatus.NOT_STARTED):
-            yield action
+        for action in this._actions.values():
+            by_status.setdefault(action.status, []).append(action)
 
-    @property
-    async def actions_in_progress(this) -> AsyncIterable[AbstractSyncAction]:
-        async for action in this.filter_by_status(SyncStatus.IN_PROGRESS):
-            yield action
+        this._by_status = by_status
 
-    @property
-    async def actions_successful(this) -> AsyncIterable[AbstractSyncAction]:
-        async for action in this.filter_by_status(SyncStatus.SUCCESS):
-            yield action
+    def filter_by_status(this, status:SyncStatus) -> Iterable[AbstractSyncAction]:
+        # status as of the last refresh (if the actions haven't changed since then)
+        if this._by_status is not None:
+            return iter(this._by_status.get(status, []))
+
+        return (action for action in this._actions.values() if action.status == status)
 
     @property
-    async def actions_failed(this) -> AsyncIterable[AbstractSyncAction]:
-        async for action in this.filter_by_status(SyncStatus.FAILED):
-            yield action
+    def actions(this) -> Iterable[AbstractSyncAction]:
+        return iter(this._actions.values())
 
     @property
-    async def actions_finished(this) -> AsyncIterable[AbstractSyncAction]:
-        async for action in this.actions_successful:
-            yield action
+    def queued_actions(this) -> Iterable[AbstractSyncAction]:
+        return this.filter_by_status(SyncStatus.NOT_STARTED)
 
-        async for action in this.actions_failed:
-            yield action
+    @property
+    def actions_in_progress(this) -> Iterable[AbstractSyncAction]:
+        return this.filter_by_status(SyncStatus.IN_PROGRESS)
 
+    @property
+    def actions_successful(this) -> Iterable[AbstractSyncAction]:
+        return this.filter_by_status(SyncStatus.SUCCESS)
 
     @property
-    async def active_actions(this) -> AsyncIterable[AbstractSyncAction]:
-        async for action in this.queued_actions:
-            yield action
+    def actions_failed(this) -> Iterable[AbstractSyncAction]:
+        return this.filter_by_status(SyncStatus.FAILED)
 
-        async for action in this.actions_in_progress:
-            yield action
+    @property
+    def actions_finished(this) -> Iterable[AbstractSyncAction]:
+        yield from this.actions_successful
+        yield from this.actions_failed
 
+    @property
+    def active_actions(this) -> Iterable[AbstractSyncAction]:
+        yield from this.queued_actions
+        yield from this.actions_in_progress
 
-    async def has_finished(this) -> bool:
-        try:
-            async for _ in this.queued_actions:
-                return False
+    def _count_by_status(this, status:SyncStatus) -> int:
+        if this._by_status is not None:
+            return len(this._by_status.get(status, []))
 
-            async for _ in this.actions_in_progress:
-                return False
-        except Exception as e:
-            print(e)
-            ...
+        return sum(1 for _ in this.filter_by_status(status))
 
-        return True
+    def status_counts(this) -> Tuple[int, int, int, int]:
+        """
+        Counts the actions by their status (as of the last refresh, see refresh_status)
 
+        :return: A tuple with the number of actions not started, in progress, successful and failed
+        """
+        return (this._count_by_status(SyncStatus.NOT_STARTED), this._count_by_status(SyncStatus.IN_PROGRESS),
+                this._count_by_status(SyncStatus.SUCCESS), this._count_by_status(SyncStatus.FAILED))
 
-    async def current_capacity(this) -> int:
-        max = this.max_transfers
+    def has_finished(this) -> bool:
+        return (this._count_by_status(SyncStatus.NOT_STARTED) + this._count_by_status(SyncStatus.IN_PROGRESS)) == 0
 
-        async for _ in this.actions_in_progress:
-            max-=1
+    def current_capacity(this) -> int:
+        max = this.max_transfers - this._count_by_status(SyncStatus.IN_PROGRESS)
 
         return max if max>=0 else 0
 
     async def attempt_job_submission(this):
-        capacity = await this.current_capacity()
+        capacity = this.current_capacity()
 
         if capacity > 0:
-            async for action in this.queued_actions:
-                if capacity > 0 :
-                    await action.apply_action(this._rclone)
-                    capacity-=1
+            to_submit = list(islice(this.queued_actions, capacity))
 
-            await asyncio.sleep(0.5)
+            # copies only start a job in rclone: those requests are sent all together, rather than waiting for each reply
+            await asyncio.gather(*[action.apply_action(this._rclone) for action in to_submit
+                                   if not isinstance(action, DeleteSyncAction)])
+
+            # deletions are carried out straight away instead, so they keep the order given by rearrange_actions
+            # (a directory can't be deleted before what's in it)
+            for action in to_submit:
+                if isinstance(action, DeleteSyncAction):
+                    await action.apply_action(this._rclone)
 
 
     def append(this, action:AbstractSyncAction) -> None:
         if (not isinstance(action, NoSyncAction)) and (action.status != SyncStatus.SUCCESS) and (not action.excluded):
-            this._actions.append(action)
+            this._actions[id(action)] = action
+            this._by_status = None
 
     def remove(this, action:AbstractSyncAction) -> None:
         del this[action]
     def __delitem__(this, action:AbstractSyncAction) -> None:
-        idx = this._actions.index(action)
-        del this._actions[idx]
+        this._actions.pop(id(action), None)
+        this._by_status = None
 
     def rearrange_actions(this) -> None:
         # Sort the actions in a way that should minimise the risk of deleting a non-empty directory
@@ -786,7 +1062,7 @@ class TransferManager:
         folder_deletion = []
         other_actions = []
 
-        for action in this._actions:
+        for action in this._actions.values():
             if (action.type == ActionType.DELETE) and (action.is_folder):
                 folder_deletion.append(action)
             else:
@@ -795,4 +1071,5 @@ class TransferManager:
 
         folder_deletion.sort(key=lambda x:x.a.filename if x.a.filename is not None else x.b.filename, reverse=True)
 
-        this._actions = other_actions + folder_deletion
+        this._actions = {id(action): action for action in other_actions + folder_deletion}
+        this._by_status = None
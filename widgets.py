@@ -754,7 +754,7 @@ class DirectoryComparisonDataTable(DataTable):
                        (this.show_delete and (action.type == ActionType.DELETE)) )
 
         i = 0
-        async for itm in this._sync_manager.changes:
+        for itm in this._sync_manager:
             if is_visible(itm):
                 this._displayed_actions.append(itm)
 
@@ -829,8 +829,9 @@ class DirectoryComparisonDataTable(DataTable):
         if (this.changes is None) or (len(this._displayed_actions) == 0):
             return
 
-        for action in this.selected_actions:
-            this._sync_manager.cancel_action(action, in_place=True)
+        # actions that are already cancelled are left as they are
+        this._sync_manager.replace_all([(action, new_action) for action in this.selected_actions
+                                        if (new_action := this._sync_manager.cancel_action(action)) is not action])
 
         await this.refresh_table()
 
@@ -863,13 +864,17 @@ class DirectoryComparisonDataTable(DataTable):
         if (this.changes is None) or (len(this._displayed_actions) == 0):
             return
 
+        replacements = []
+
         for action in this.selected_actions:
             new_dir = ActionDirection.SRC2DST if key == "right" else ActionDirection.DST2SRC
 
             new_action = this._change_direction_to_action(action, new_dir)
 
             if new_action is not None:
-                this._sync_manager.replace(action, new_action)
+                replacements.append((action, new_action))
+
+        this._sync_manager.replace_all(replacements)
 
         await this.refresh_table()
 
@@ -877,8 +882,9 @@ class DirectoryComparisonDataTable(DataTable):
         if (this.changes is None) or (len(this._displayed_actions) == 0):
             return
 
-        for action in this.selected_actions:
-            this._sync_manager.convert_to_delete(action, in_place= True)
+        # actions that are deletions already are left as they are
+        this._sync_manager.replace_all([(action, new_action) for action in this.selected_actions
+                                        if (new_action := this._sync_manager.convert_to_delete(action)) is not action])
 
         await this.refresh_table()
 
@@ -886,9 +892,13 @@ class DirectoryComparisonDataTable(DataTable):
         if (this.changes is None) or (len(this._displayed_actions) == 0):
             return
 
+        replacements = []
+
         for action in this.selected_actions:
             action.apply_both_sides()
-            this._sync_manager.replace(action, action) # replace with itself to trigger all cascade effects
+            replacements.append((action, action)) # replace with itself to trigger all cascade effects
+
+        this._sync_manager.replace_all(replacements)
 
         await this.refresh_table()
 